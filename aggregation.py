@@ -0,0 +1,164 @@
+import numpy as np
+import pandas as pd
+
+
+CUBE_MEASURES = ['doanh_thu', 'loi_nhuan', 'so_luong']
+
+
+# =========================================================
+# KHỐI DỮ LIỆU TỔNG HỢP SẴN: NGÀY x DANH MỤC x SẢN PHẨM
+# =========================================================
+# cells: mỗi dòng là một ô ngày x danh mục x sản phẩm với tổng doanh thu, lợi nhuận, số lượng, số dòng
+# orders: các bộ (ngày, danh mục, mã đơn hàng) không trùng lặp, dùng để đếm số đơn chính xác
+def build_aggregates(df):
+    day = df['ngay_dat_hang'].dt.floor('D').rename('ngay')
+    grouped = df.groupby([day, df['danh_muc'], df['ten_san_pham']], observed=True, dropna=False, sort=False)
+    cells = grouped[CUBE_MEASURES].sum().astype('float64')
+    cells['so_dong'] = grouped.size()
+    cells = cells.reset_index()
+    # Dòng không có danh mục không bao giờ khớp bộ lọc danh mục nên bị loại khỏi khối
+    cells = cells[cells['danh_muc'].notna()].reset_index(drop=True)
+    orders = pd.DataFrame({
+        'ngay': day.to_numpy(),
+        'danh_muc': df['danh_muc'].to_numpy(),
+        'ma_don_hang': df['ma_don_hang'].to_numpy(),
+    }).dropna().drop_duplicates(ignore_index=True)
+    return cells, orders
+
+
+# Mã đơn hàng được lưu theo từng ô ngày x danh mục (dạng CSR: cell_ids + offsets)
+# để đếm số đơn hàng không trùng lặp khi gộp nhiều ô.
+class SalesCube:
+    def __init__(self, cells, orders):
+        self.days = pd.DatetimeIndex(cells['ngay'].drop_duplicates().sort_values())
+        cat_code, categories = pd.factorize(cells['danh_muc'])
+        prod_code, products = pd.factorize(cells['ten_san_pham'])
+        self.categories = pd.Index(np.asarray(categories))
+        self.products = pd.Index(np.asarray(products))
+
+        self.cells = pd.DataFrame({
+            'day': self.days.get_indexer(cells['ngay']),
+            'cat': cat_code,
+            'prod': prod_code,
+        })
+        for col in CUBE_MEASURES + ['so_dong']:
+            self.cells[col] = cells[col].to_numpy()
+        self.cells = self.cells.sort_values(['day', 'cat', 'prod'], ignore_index=True)
+
+        order_code, order_uniques = pd.factorize(orders['ma_don_hang'])
+        self.n_orders = len(order_uniques)
+        self._build_order_index(
+            self.days.get_indexer(orders['ngay']),
+            self.categories.get_indexer(np.asarray(orders['danh_muc'])),
+            order_code,
+        )
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls(*build_aggregates(df))
+
+    def __sizeof__(self):
+        arrays = (self._order_codes, self._order_cell_ids, self._order_offsets)
+        return (
+            int(self.cells.memory_usage(index=True, deep=True).sum())
+            + sum(a.nbytes for a in arrays)
+            + int(self.categories.memory_usage(deep=True))
+            + int(self.products.memory_usage(deep=True))
+        )
+
+    def _build_order_index(self, day_code, cat_code, order_code):
+        has_order = (order_code >= 0) & (day_code >= 0) & (cat_code >= 0)
+        cell_id = day_code[has_order].astype('int64') * len(self.categories) + cat_code[has_order]
+        # Ghép (ô, mã đơn) thành một số nguyên để loại trùng bằng một lần np.unique
+        n_orders = max(self.n_orders, 1)
+        pairs = np.unique(cell_id * n_orders + order_code[has_order])
+        pair_cells = pairs // n_orders
+        self._order_codes = (pairs % n_orders).astype('int64')
+        boundaries = np.flatnonzero(np.diff(pair_cells)) + 1
+        starts = np.concatenate([[0], boundaries]) if len(pairs) else np.array([], dtype='int64')
+        self._order_cell_ids = pair_cells[starts]
+        self._order_offsets = np.append(starts, len(pairs))
+
+    def select(self, categories, start_date, end_date):
+        # Khoảng ngày [start_date, end_date] tính trọn ngày, tìm bằng tìm kiếm nhị phân
+        day_lo = self.days.searchsorted(pd.Timestamp(start_date).floor('D'), side='left')
+        day_hi = self.days.searchsorted(pd.Timestamp(end_date).floor('D'), side='right')
+        cat_codes = self.categories.get_indexer(pd.Index(list(categories)))
+        cat_codes = np.unique(cat_codes[cat_codes >= 0])
+        return CubeSelection(self, day_lo, day_hi, cat_codes)
+
+
+class CubeSelection:
+    def __init__(self, cube, day_lo, day_hi, cat_codes):
+        self.cube = cube
+        self.day_lo = day_lo
+        self.day_hi = day_hi
+        self.cat_codes = cat_codes
+        days = cube.cells['day'].to_numpy()
+        row_lo, row_hi = days.searchsorted(day_lo, 'left'), days.searchsorted(day_hi, 'left')
+        cells = cube.cells.iloc[row_lo:row_hi]
+        self.cells = cells[cells['cat'].isin(cat_codes)]
+
+    @property
+    def empty(self):
+        return self.cells.empty
+
+    def totals(self):
+        return self.cells[CUBE_MEASURES].sum()
+
+    def labeled_cells(self):
+        # Các ô của vùng chọn gắn nhãn thật (ngày, tên danh mục / sản phẩm) thay cho mã số nội bộ, vì mã số
+        # thay đổi khi dữ liệu được cộng dồn. Dùng làm khóa ghi nhớ mô hình: chỉ đổi khi các ô này đổi.
+        # Danh mục / sản phẩm để dạng categorical nên việc băm chỉ băm mỗi tên một lần.
+        cube = self.cube
+        data = {
+            'ngay': cube.days[self.cells['day'].to_numpy()],
+            'danh_muc': pd.Categorical.from_codes(self.cells['cat'].to_numpy(), categories=cube.categories),
+            'ten_san_pham': pd.Categorical.from_codes(self.cells['prod'].to_numpy(), categories=cube.products),
+        }
+        for col in CUBE_MEASURES:
+            data[col] = self.cells[col].to_numpy()
+        return pd.DataFrame(data)
+
+    def order_count(self):
+        cube = self.cube
+        if cube.n_orders == 0 or len(self.cat_codes) == 0:
+            return 0
+        wanted = (
+            np.arange(self.day_lo, self.day_hi, dtype='int64')[:, None] * len(cube.categories)
+            + self.cat_codes[None, :]
+        ).ravel()
+        pos = cube._order_cell_ids.searchsorted(wanted)
+        pos = pos[pos < len(cube._order_cell_ids)]
+        pos = pos[np.isin(cube._order_cell_ids[pos], wanted)]
+        if len(pos) == 0:
+            return 0
+        seen = np.zeros(cube.n_orders, dtype=bool)
+        for i in pos:
+            seen[cube._order_codes[cube._order_offsets[i]:cube._order_offsets[i + 1]]] = True
+        return int(seen.sum())
+
+    def revenue_by_date(self):
+        # Tương đương resample('D'): đủ mọi ngày từ ngày đầu đến ngày cuối, ngày trống = 0
+        by_day = self.cells.groupby('day')['doanh_thu'].sum()
+        if by_day.empty:
+            return pd.DataFrame({'ngay_dat_hang': pd.DatetimeIndex([]), 'doanh_thu': []})
+        by_day.index = self.cube.days[by_day.index]
+        full_range = pd.date_range(by_day.index.min(), by_day.index.max(), freq='D')
+        by_day = by_day.reindex(full_range, fill_value=0)
+        return pd.DataFrame({'ngay_dat_hang': by_day.index, 'doanh_thu': by_day.to_numpy()})
+
+    def profit_by_product(self):
+        cells = self.cells[self.cells['prod'] >= 0]
+        by_product = cells.groupby('prod')['loi_nhuan'].sum().sort_values()
+        return pd.DataFrame({
+            'ten_san_pham': self.cube.products[by_product.index],
+            'loi_nhuan': by_product.to_numpy(),
+        })
+
+    def revenue_by_category(self):
+        by_category = self.cells.groupby('cat')['doanh_thu'].sum()
+        return pd.DataFrame({
+            'danh_muc': self.cube.categories[by_category.index],
+            'doanh_thu': by_category.to_numpy(),
+        })
@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from anomaly import ANOMALY_REFIT_FRACTION, AnomalyEngine
+
+
+# =========================================================
+# CÁC MÔ HÌNH AI (KHÔNG PHỤ THUỘC GIAO DIỆN)
+# =========================================================
+# Mỗi hàm trả về dict gồm mô hình đã huấn luyện và kết quả cần vẽ, để ModelRegistry ghi nhớ.
+# sklearn / statsmodels chỉ được import khi hàm được gọi, để import module (và khởi động ứng dụng) nhanh.
+
+# --- DỰ BÁO DOANH THU ---
+def forecast_revenue(revenue_by_date, future_days=30):
+    from sklearn.linear_model import LinearRegression
+
+    df_ai = revenue_by_date.copy()
+    # Nhận biết Thứ trong tuần
+    df_ai['ngay_so'] = (df_ai['ngay_dat_hang'] - df_ai['ngay_dat_hang'].min()).dt.days
+    df_ai['thu_trong_tuan'] = df_ai['ngay_dat_hang'].dt.dayofweek # 0 là Thứ 2, 6 là Chủ nhật
+
+    # AI học dựa trên 2 yếu tố: Thời gian trôi qua + Là thứ mấy
+    X = df_ai[['ngay_so', 'thu_trong_tuan']]
+    y = df_ai['doanh_thu']
+
+    model_lr = LinearRegression()
+    model_lr.fit(X, y)
+
+    # Lên lịch các ngày tương lai
+    future_dates = [df_ai['ngay_dat_hang'].max() + timedelta(days=i) for i in range(1, future_days + 1)]
+    future_X = pd.DataFrame({
+        'ngay_so': [(d - df_ai['ngay_dat_hang'].min()).days for d in future_dates],
+        'thu_trong_tuan': [d.weekday() for d in future_dates]
+    })
+    future_pred = model_lr.predict(future_X)
+
+    df_future = pd.DataFrame({'ngay_dat_hang': future_dates, 'doanh_thu': future_pred, 'loai': 'Dự báo (AI)'})
+    df_ai['loai'] = 'Thực tế'
+    df_final_lr = pd.concat([df_ai[['ngay_dat_hang', 'doanh_thu', 'loai']], df_future])
+    return {'model': model_lr, 'forecast': df_final_lr}
+
+
+# --- PHÁT HIỆN GIAO DỊCH BẤT THƯỜNG ---
+# Chấm điểm toàn bộ dữ liệu một lần; khi đổi bộ lọc chỉ cần tra điểm theo vị trí dòng.
+# key_columns: khóa ổn định của từng dòng (kho cộng dồn), lưu kèm để update_anomalies ghép được điểm cũ
+def detect_anomalies(df, contamination=0.05, per_category=False, random_state=42, n_jobs=-1, key_columns=None):
+    engine = AnomalyEngine(contamination=contamination, per_category=per_category, random_state=random_state,
+                           n_jobs=n_jobs)
+    engine.fit(df)
+    result = {'model': engine, 'scores': engine.score(df)}
+    if key_columns is not None:
+        result['keys'] = df[key_columns].reset_index(drop=True)
+    return result
+
+
+# --- CẬP NHẬT ĐIỂM SAU KHI CỘNG DỒN: DÙNG LẠI MÔ HÌNH, CHỈ CHẤM LẠI CÁC NGÀY THAY ĐỔI ---
+# Trả về None (để huấn luyện lại từ đầu) khi phần thay đổi quá lớn hoặc không ghép được với kết quả cũ
+def update_anomalies(previous, df, changed_dates, key_columns):
+    if 'keys' not in previous:
+        return None
+    old_keys = pd.MultiIndex.from_frame(previous['keys'])
+    if not old_keys.is_unique:
+        return None
+    old_positions = old_keys.get_indexer(pd.MultiIndex.from_frame(df[key_columns]))
+    changed = df['ngay_dat_hang'].dt.floor('D').isin(changed_dates).to_numpy() | (old_positions < 0)
+    if changed.mean() > ANOMALY_REFIT_FRACTION:
+        return None
+    engine = previous['model']
+    scores = previous['scores']['score'].to_numpy()[np.where(changed, 0, old_positions)]
+    if changed.any():
+        scores[changed] = engine.score(df.iloc[np.flatnonzero(changed)])['score'].to_numpy()
+    labels = np.where(scores < 0, -1, 1).astype('int8')
+    return {
+        'model': engine,
+        'scores': pd.DataFrame({'score': scores, 'anomaly': labels}),
+        'keys': df[key_columns].reset_index(drop=True),
+    }
+
+
+# --- PHÂN RÃ MÙA VỤ ---
+def seasonal_pattern(revenue, period=7):
+    from statsmodels.tsa.seasonal import seasonal_decompose
+
+    decomp = seasonal_decompose(revenue, model='additive', period=period)
+    return {'seasonal': decomp.seasonal}
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+
+
+ANOMALY_FEATURES = ['so_luong', 'don_gia', 'loi_nhuan']
+# Số dòng tối đa dùng để huấn luyện mỗi mô hình
+ANOMALY_SAMPLE_ROWS = 50_000
+# Mỗi nhóm (danh mục) có ít nhất chừng này dòng trong mẫu nếu đủ dữ liệu
+ANOMALY_MIN_PER_STRATUM = 200
+# Số dòng chấm điểm trong mỗi lô
+ANOMALY_BATCH_ROWS = 100_000
+# Kho cộng dồn: phần dòng thay đổi vượt tỷ lệ này thì huấn luyện lại mô hình thay vì chỉ chấm lại điểm
+ANOMALY_REFIT_FRACTION = 0.2
+# Số điểm "bình thường" / "bất thường" tối đa gửi lên biểu đồ phân tán
+SCATTER_MAX_NORMAL = 5_000
+SCATTER_MAX_ANOMALIES = 15_000
+
+
+# --- LẤY MẪU PHÂN TẦNG THEO NHÓM ---
+def stratified_sample(df, by, max_rows, min_per_stratum=ANOMALY_MIN_PER_STRATUM, random_state=42):
+    if len(df) <= max_rows:
+        return df
+    rng = np.random.default_rng(random_state)
+    codes, uniques = pd.factorize(df[by])
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(-1, len(uniques) + 1))
+    frac = max_rows / len(df)
+    picked = []
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        size = hi - lo
+        if size == 0:
+            continue
+        n_pick = min(size, max(min_per_stratum, int(round(size * frac))))
+        picked.append(rng.choice(order[lo:hi], n_pick, replace=False))
+    return df.iloc[np.sort(np.concatenate(picked))]
+
+
+# =========================================================
+# BỘ MÁY PHÁT HIỆN BẤT THƯỜNG
+# =========================================================
+# Huấn luyện IsolationForest trên mẫu phân tầng có giới hạn, sau đó chấm điểm toàn bộ các dòng
+# theo từng lô song song. Với per_category=True mỗi danh mục có một mô hình riêng.
+class AnomalyEngine:
+    def __init__(self, contamination=0.05, per_category=False, max_sample=ANOMALY_SAMPLE_ROWS,
+                 n_jobs=-1, random_state=42):
+        self.contamination = contamination
+        self.per_category = per_category
+        self.max_sample = max_sample
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.models = {}
+
+    def _groups(self, df):
+        if not self.per_category:
+            return {None: np.arange(len(df))}
+        codes, uniques = pd.factorize(df['danh_muc'])
+        return {uniques[i]: np.flatnonzero(codes == i) for i in range(len(uniques))}
+
+    def fit(self, df):
+        # Import khi cần: sklearn nặng, không nên làm chậm việc import module
+        from sklearn.ensemble import IsolationForest
+
+        self.models = {}
+        for key, positions in self._groups(df).items():
+            part = df.iloc[positions]
+            sample = stratified_sample(part, 'danh_muc', self.max_sample, random_state=self.random_state)
+            if len(sample) <= 10:
+                continue
+            model = IsolationForest(
+                contamination=self.contamination, random_state=self.random_state, n_jobs=self.n_jobs
+            )
+            model.fit(sample[ANOMALY_FEATURES].to_numpy(dtype='float64'))
+            self.models[key] = model
+        return self
+
+    def _decision(self, model, X):
+        batches = [X[i:i + ANOMALY_BATCH_ROWS] for i in range(0, len(X), ANOMALY_BATCH_ROWS)]
+        if len(batches) <= 1:
+            return model.decision_function(X)
+        from joblib import Parallel, delayed
+
+        # Các lô được chấm điểm song song (luồng), mỗi lô là một phép tính vector hóa
+        results = Parallel(n_jobs=self.n_jobs, prefer='threads')(
+            delayed(model.decision_function)(batch) for batch in batches
+        )
+        return np.concatenate(results)
+
+    def score(self, df):
+        X = df[ANOMALY_FEATURES].to_numpy(dtype='float64')
+        scores = np.zeros(len(df), dtype='float32')
+        for key, positions in self._groups(df).items():
+            model = self.models.get(key)
+            # Nhóm quá ít dữ liệu để huấn luyện thì coi như bình thường
+            if model is None or len(positions) == 0:
+                continue
+            scores[positions] = self._decision(model, X[positions])
+        # Giống IsolationForest.predict: điểm < 0 là bất thường (-1), còn lại bình thường (1)
+        labels = np.where(scores < 0, -1, 1).astype('int8')
+        # Đánh chỉ số theo vị trí dòng, không theo nhãn index của df: kết quả được ghi nhớ theo mã băm file,
+        # còn df đọc lại từ bản sao dạng cột có index mới. Tra điểm bằng score_positions.
+        return pd.DataFrame({'score': scores, 'anomaly': labels})
+
+
+# --- VỊ TRÍ TRONG BẢNG ĐIỂM CỦA CÁC DÒNG (df_selection là một phần của df) ---
+def score_positions(df, rows):
+    return df.index.get_indexer(rows.index)
+
+
+# --- DỮ LIỆU CHO BIỂU ĐỒ PHÂN TÁN: ĐIỂM BẤT THƯỜNG + MẪU ĐIỂM BÌNH THƯỜNG, CÓ NGÂN SÁCH ĐIỂM ---
+def scatter_sample(model_data, max_normal=SCATTER_MAX_NORMAL, max_anomalies=SCATTER_MAX_ANOMALIES, random_state=42):
+    is_anomaly = model_data['anomaly'] == -1
+    anomalies = model_data[is_anomaly]
+    normal = model_data[~is_anomaly]
+    if len(anomalies) > max_anomalies:
+        anomalies = anomalies.sample(max_anomalies, random_state=random_state)
+    if len(normal) > max_normal:
+        normal = normal.sample(max_normal, random_state=random_state)
+    return pd.concat([anomalies, normal])
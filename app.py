@@ -1,144 +1,212 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import re
-import numpy as np
-from datetime import timedelta
-
-from sklearn.linear_model import LinearRegression
-from sklearn.ensemble import IsolationForest
-from sklearn.preprocessing import PolynomialFeatures
-from statsmodels.tsa.seasonal import seasonal_decompose
-
-# --- 1. HÀM CHUẨN HÓA TÊN CỘT ---
-def simple_normalize(col_name):
-    if col_name is None:
-        return None
-    normalized = str(col_name).lower()
-    normalized = re.sub(r'[àáạảãâầấậẩẫăằắặẳẵ]', 'a', normalized)
-    normalized = re.sub(r'[èéẹẻẽêềếệểễ]', 'e', normalized)
-    normalized = re.sub(r'[òóọỏõôồốộổỗơờớợởỡ]', 'o', normalized)
-    normalized = re.sub(r'[ìíịỉĩ]', 'i', normalized)
-    normalized = re.sub(r'[ùúụủũưừứựửữ]', 'u', normalized)
-    normalized = re.sub(r'[ỳýỵỷỹ]', 'y', normalized)
-    normalized = re.sub(r'[đ]', 'd', normalized)
-    normalized = re.sub(r'[\s\.-]+', '_', normalized)
-    normalized = re.sub(r'[^a-z0-9_]', '', normalized)
-    return normalized.strip('_')
-
-# --- 2. DANH SÁCH CÁC CỘT CẦN THIẾT ---
-CANONICAL_COLUMNS = [
-    'ngay_dat_hang', 'ma_don_hang', 'ten_san_pham', 
-    'danh_muc', 'so_luong', 'don_gia', 'chi_phi'
-]
-
-# --- 3. BẢN ĐỒ ÁNH XẠ ---
-COLUMN_MAP = {
-    'ngay_dat_hang': 'ngay_dat_hang', 'ngay_dat': 'ngay_dat_hang', 'order_date': 'ngay_dat_hang', 'ngay_hang': 'ngay_dat_hang',
-    'ma_don_hang': 'ma_don_hang', 'ma_don': 'ma_don_hang', 'order_id': 'ma_don_hang', 'ma_dh': 'ma_don_hang',
-    'ten_san_pham': 'ten_san_pham', 'ten_sp': 'ten_san_pham', 'product_name': 'ten_san_pham',
-    'danh_muc': 'danh_muc', 'category': 'danh_muc', 'phan_loai': 'danh_muc',
-    'so_luong': 'so_luong', 'soluong': 'so_luong', 'quantity': 'so_luong', 'sl': 'so_luong',
-    'don_gia': 'don_gia', 'dongia': 'don_gia', 'dGia': 'don_gia', 'gia_ban': 'don_gia', 'price': 'don_gia',
-    'chi_phi': 'chi_phi', 'chiphi': 'chi_phi', 'gia_von': 'chi_phi', 'cost': 'chi_phi', 'gia_goc': 'chi_phi'
-}
-
-# --- HÀM ĐỔI TÊN VÀ KIỂM TRA ---
-def rename_and_validate(df):
-    original_cols = df.columns
-    new_cols = []
-    for col in original_cols:
-        normalized_col = simple_normalize(col)
-        canonical_name = COLUMN_MAP.get(normalized_col)
-        if canonical_name:
-            new_cols.append(canonical_name)
-        else:
-            new_cols.append(normalized_col)
-    df.columns = new_cols
-    uploaded_columns = set(df.columns)
-    required_columns = set(CANONICAL_COLUMNS)
-    if required_columns.issubset(uploaded_columns):
-        return True, None
-    else:
-        missing_columns = list(required_columns - uploaded_columns)
-        return False, missing_columns
-
-# --- HÀM TÍNH TOÁN ---
-def calculate_metrics(df):
-    df['so_luong'] = pd.to_numeric(df['so_luong'], errors='coerce').fillna(0)
-    df['don_gia'] = pd.to_numeric(df['don_gia'], errors='coerce').fillna(0)
-    df['chi_phi'] = pd.to_numeric(df['chi_phi'], errors='coerce').fillna(0)
-    df['ngay_dat_hang'] = pd.to_datetime(df['ngay_dat_hang'], dayfirst=True, errors='coerce')
-    df = df.dropna(subset=['ngay_dat_hang'])
-    if not df.empty:
-        df['doanh_thu'] = df['so_luong'] * df['don_gia']
-        df['loi_nhuan'] = df['doanh_thu'] - (df['so_luong'] * df['chi_phi'])
-    return df
-
-# --- HÀM DÀNH CHO NÚT TẢI XUỐNG ---
-@st.cache_data
-def convert_df_to_csv(df):
-    return df.to_csv(index=False).encode('utf-8-sig')
+
+from ai_models import detect_anomalies, forecast_revenue, seasonal_pattern, update_anomalies
+from anomaly import ANOMALY_FEATURES, scatter_sample, score_positions
+from cache import LRUCache
+from charts import LINE_MAX_POINTS, TABLE_PAGE_SIZES, RenderMonitor, downsample_line, table_page, top_with_other
+from engine import kpi_summary
+from export import EXPORT_FORMATS, export_frame
+from forecasting import BATCH_TOP_PRODUCTS, batch_forecast, forecast_summary
+from ingestion import CANONICAL_COLUMNS, load_dataset, load_store
+from model_registry import MODELS_DIR, ModelRegistry
+from pricing import PRICE_POINTS, PRICE_REPORT_COLUMNS, demand_curve, optimize_prices
+from profiling import NULL_PROFILER, StageProfiler
+from storage import COLUMNAR_DIR, STORE_DIR, STORE_KEY, OrderStore
+
+# Ngân sách bộ nhớ cho các file đã làm sạch (dùng chung giữa các phiên)
+INGEST_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+# Ngân sách cho mô hình AI đã huấn luyện: trong RAM và trên ổ đĩa
+MODEL_CACHE_MAX_BYTES = 256 * 1024 * 1024
+MODEL_DISK_MAX_BYTES = 1024 * 1024 * 1024
+# File xuất đã tạo được giữ lại tối đa chừng này dung lượng / thời gian
+EXPORT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+EXPORT_CACHE_TTL = 15 * 60
+# File CSV rất lớn chỉ được giữ ở dạng tổng hợp (xem CSV_AGGREGATE_ONLY_BYTES): các tính năng cần từng dòng bị tắt
+ROWS_NOT_KEPT = "File quá lớn nên chỉ giữ số liệu tổng hợp theo ngày / danh mục / sản phẩm; tính năng này cần từng dòng đơn hàng."
+
+# --- BỘ NHỚ ĐỆM DỮ LIỆU ĐÃ LÀM SẠCH ---
+@st.cache_resource
+def get_ingest_cache():
+    return LRUCache(INGEST_CACHE_MAX_BYTES)
+
+# --- KHO MÔ HÌNH AI ---
+@st.cache_resource
+def get_model_registry():
+    return ModelRegistry(MODEL_CACHE_MAX_BYTES, MODEL_DISK_MAX_BYTES, MODELS_DIR)
+
+# --- KHO DỮ LIỆU CỘNG DỒN ---
+@st.cache_resource
+def get_order_store():
+    return OrderStore(STORE_DIR)
+
+# --- BỘ NHỚ ĐỆM FILE XUẤT (GIỚI HẠN DUNG LƯỢNG + THỜI GIAN SỐNG) ---
+@st.cache_resource
+def get_export_cache():
+    # File bị đẩy ra hoặc hết hạn được đóng ngay, giải phóng RAM / file tạm mà không chờ bộ gom rác
+    return LRUCache(EXPORT_CACHE_MAX_BYTES, ttl=EXPORT_CACHE_TTL, on_evict=lambda export: export.close())
+
+# --- HÀM DÀNH CHO NÚT TẢI XUỐNG: CHỈ TẠO FILE KHI NGƯỜI DÙNG BẤM TẢI ---
+def deferred_export(df, key, fmt):
+    def build():
+        export_cache = get_export_cache()
+        export = export_cache.get((key, fmt))
+        data = export.read() if export is not None else None
+        if data is None:
+            export = export_frame(df, fmt)
+            # Đọc trước khi đưa vào bộ nhớ đệm: luồng khác có thể đẩy nó ra (và đóng) ngay sau đó
+            data = export.read()
+            if not export_cache.put((key, fmt), export):
+                export.close()
+        return data
+    return build
+
+# --- ĐIỂM BẤT THƯỜNG CỦA KHO CỘNG DỒN: SAU MỖI LẦN CỘNG DỒN CHỈ CHẤM LẠI CÁC NGÀY THAY ĐỔI ---
+def store_anomalies(store, version, df, params):
+    def update(previous_version, previous):
+        changed_dates = store.changed_dates(previous_version)
+        if changed_dates is None:
+            return None
+        return update_anomalies(previous, df, changed_dates, STORE_KEY)
+    return get_model_registry().get_or_update(
+        'anomaly_engine', store.directory, version, params,
+        lambda: detect_anomalies(df, key_columns=STORE_KEY, **params), update
+    )
 
 # --- CẤU HÌNH TRANG WEB ---
 st.set_page_config(page_title="Dashboard Phân Tích Doanh Thu", page_icon="💰", layout="wide")
 
+# --- VẼ BIỂU ĐỒ CÓ ĐO HIỆU NĂNG ---
+def show_chart(container, fig, name):
+    with profiler.stage(f"bieu_do: {name}"):
+        render_monitor.figure(name, fig, lambda: container.plotly_chart(fig, use_container_width=True))
+
+# --- BẢNG PHÂN TRANG: CHỈ GỬI LÊN TRÌNH DUYỆT CÁC DÒNG CỦA TRANG ĐANG XEM ---
+def show_table(df, key, name):
+    size_col, page_col = st.columns(2)
+    page_size = size_col.selectbox("Số dòng mỗi trang:", TABLE_PAGE_SIZES, key=f"{key}_page_size")
+    n_pages = max(1, -(-len(df) // page_size))
+    page = page_col.number_input(f"Trang (tổng {n_pages:,} trang):", min_value=1, value=1, step=1, key=f"{key}_page")
+    page_df, start, n_pages = table_page(df, page, page_size)
+    with profiler.stage(f"bang: {name}", rows=len(page_df)):
+        render_monitor.table(name, page_df, lambda: st.dataframe(page_df))
+    st.caption(f"Dòng {start + 1:,} - {start + len(page_df):,} / {len(df):,}")
+
 # --- GIAO DIỆN CHÍNH ---
 st.title("💰 Dashboard Phân Tích Doanh Thu & Hỗ Trợ Quyết Định (AI)")
 st.markdown("---")
 
 # --- THANH BÊN ---
 st.sidebar.header("Tải Lên File Của Bạn")
+append_mode = st.sidebar.toggle(
+    "Cộng dồn vào kho dữ liệu",
+    help="Gộp file mới vào dữ liệu đã lưu (loại trùng theo mã đơn hàng + sản phẩm) thay vì xử lý lại từ đầu."
+)
 uploaded_file = st.sidebar.file_uploader("Chọn file Excel hoặc CSV", type=["xlsx", "csv"])
+# Bảng gỡ lỗi: đo thời gian (và bộ nhớ nếu bật) của từng giai đoạn trong lượt chạy này
+debug_mode = st.sidebar.toggle("🐞 Đo hiệu năng từng giai đoạn", key="debug_mode")
+trace_memory = debug_mode and st.sidebar.checkbox("Đo cả bộ nhớ (chậm hơn)", key="debug_trace_memory")
+profiler = StageProfiler(trace_memory=trace_memory) if debug_mode else NULL_PROFILER
+# Đo số điểm, dung lượng gửi lên trình duyệt và thời gian vẽ của từng biểu đồ / bảng trong lượt chạy này;
+# chỉ đo khi bật bảng gỡ lỗi, bình thường chỉ vẽ
+render_monitor = RenderMonitor(enabled=profiler.enabled)
+order_store = get_order_store() if append_mode else None
+if order_store is not None and not order_store.empty:
+    if st.sidebar.button("🗑️ Xóa kho dữ liệu"):
+        order_store.clear()
+        # File đang nằm trong ô tải lên không được cộng lại vào kho vừa xóa (kể cả ở các lượt chạy sau);
+        # tải lên lại (kể cả cùng file) sẽ có file_id mới và được cộng dồn bình thường
+        st.session_state["store_skip_upload"] = uploaded_file.file_id if uploaded_file is not None else None
+        st.sidebar.info("Đã xóa kho dữ liệu.")
 
-if uploaded_file is not None:
+if uploaded_file is not None or (order_store is not None and not order_store.empty):
     try:
-        if uploaded_file.name.endswith('.xlsx'):
-            df = pd.read_excel(uploaded_file, engine='openpyxl') 
-        else:
-            df = pd.read_csv(uploaded_file)
-        
-        is_valid, missing_or_duplicate_cols = rename_and_validate(df)
-        
-        if is_valid:
-            if df.empty:
+        ingest_cache = get_ingest_cache()
+        ingest_result = None
+        store_version = None
+        header_matches = None
+        if uploaded_file is not None:
+            with profiler.stage("ingestion"):
+                ingest_result = load_dataset(uploaded_file.getvalue(), uploaded_file.name, cache=ingest_cache,
+                                             columnar_dir=COLUMNAR_DIR, profiler=profiler)
+            header_matches = ingest_result.header_matches
+        if order_store is not None and (ingest_result is None or ingest_result.missing_columns is None):
+            skip_append = uploaded_file is not None and uploaded_file.file_id == st.session_state.get("store_skip_upload")
+            if (ingest_result is not None and ingest_result.df is not None and not ingest_result.df.empty
+                    and not skip_append):
+                with profiler.stage("store_append", rows=len(ingest_result.df)):
+                    append_report = order_store.append(ingest_result.df, source=ingest_result.fingerprint)
+                if not append_report.skipped:
+                    st.sidebar.success(
+                        f"Đã cộng dồn {append_report.added_rows:,} dòng mới, cập nhật {append_report.replaced_rows:,} dòng"
+                        f" ({len(append_report.affected_dates)} ngày thay đổi)."
+                    )
+            elif ingest_result is not None and ingest_result.df is None:
+                st.sidebar.warning(f"Không cộng dồn được vào kho. {ROWS_NOT_KEPT}")
+            # Kho vừa bị xóa và file không được cộng lại: hiển thị riêng file đang tải lên
+            if not order_store.empty or ingest_result is None:
+                store_version = order_store.version
+                with profiler.stage("ingestion: kho dữ liệu"):
+                    ingest_result = load_store(order_store, cache=ingest_cache, profiler=profiler)
+        df, missing_or_duplicate_cols, raw_rows = ingest_result.df, ingest_result.missing_columns, ingest_result.raw_rows
+        with st.sidebar.expander("Bộ nhớ đệm dữ liệu"):
+            cache_stats = ingest_cache.stats()
+            st.caption(
+                f"Hit: {cache_stats['hits']} · Miss: {cache_stats['misses']} · Evict: {cache_stats['evictions']}"
+                f" · {cache_stats['bytes'] / 1024**2:,.1f} / {cache_stats['max_bytes'] / 1024**2:,.0f} MB"
+            )
+            model_stats = get_model_registry().stats()
+            st.caption(
+                f"Mô hình AI · Hit: {model_stats['hits']} · Từ ổ đĩa: {model_stats['disk_hits']}"
+                f" · Huấn luyện: {model_stats['fits']} · Cập nhật: {model_stats['updates']}"
+                f" · Evict: {model_stats['evictions']}"
+            )
+
+        # Cột chỉ khớp gần đúng (lỗi chính tả, viết liền...) được báo lại để người dùng tự kiểm tra
+        if header_matches:
+            st.info(
+                "Một số cột được nhận diện gần đúng, vui lòng kiểm tra: "
+                + "; ".join(f"**{original}** → `{canonical}` ({score:.0%})" for original, canonical, score in header_matches)
+            )
+
+        if missing_or_duplicate_cols is None:
+            if raw_rows == 0:
                 st.warning("File bạn tải lên không có dữ liệu để phân tích sau khi kiểm tra cấu trúc.")
             else:
-                df = calculate_metrics(df)
-                if df.empty:
+                if ingest_result.cube is None:
                     st.warning("Không có dữ liệu hợp lệ để phân tích sau khi xử lý ngày tháng. Vui lòng kiểm tra lại cột ngày tháng.")
                 else:
                     st.sidebar.header("Bộ Lọc:")
+                    # Danh mục / khoảng ngày lấy từ khối tổng hợp: có cả khi file chỉ được giữ ở dạng tổng hợp (df=None)
+                    cube = ingest_result.cube
                     category = st.sidebar.multiselect(
-                        "Chọn Danh Mục:", options=df["danh_muc"].unique(), default=df["danh_muc"].unique()
+                        "Chọn Danh Mục:", options=cube.categories, default=list(cube.categories)
                     )
-                    min_date = df["ngay_dat_hang"].min().date()
-                    max_date = df["ngay_dat_hang"].max().date()
+                    min_date = cube.days.min().date()
+                    max_date = cube.days.max().date()
                     date_range = st.sidebar.date_input(
                         "Chọn Khoảng Thời Gian:", value=(min_date, max_date), min_value=min_date, max_value=max_date
                     )
                     
                     start_date = pd.to_datetime(date_range[0])
                     end_date = pd.to_datetime(date_range[1])
-                    df_selection = df.query("danh_muc == @category & ngay_dat_hang >= @start_date & ngay_dat_hang <= @end_date")
+                    # Ngày kết thúc được tính trọn ngày, khớp với khối tổng hợp theo ngày
+                    with profiler.stage("filtering", rows=raw_rows):
+                        df_selection = ingest_result.filter_index.select(category, start_date, end_date) if df is not None else None
+                        cube_selection = cube.select(category, start_date, end_date)
                     
-                    if df_selection.empty:
+                    if cube_selection.empty:
                         st.warning("Không có dữ liệu nào phù hợp với bộ lọc của bạn!")
                     else:
                         # --- TÍNH TOÁN CÁC CHỈ SỐ KPI ---
-                        total_revenue = int(df_selection["doanh_thu"].sum())
-                        total_profit = int(df_selection["loi_nhuan"].sum())
-                        total_orders = df_selection["ma_don_hang"].nunique()
-                        
-                        if total_orders > 0:
-                            average_order_value = total_revenue / total_orders
-                        else:
-                            average_order_value = 0
-                        
-                        if total_revenue > 0:
-                            profit_margin = (total_profit / total_revenue) * 100
-                        else:
-                            profit_margin = 0
+                        with profiler.stage("kpi"):
+                            kpis = kpi_summary(cube_selection)
+                        total_revenue = kpis["tong_doanh_thu"]
+                        total_profit = kpis["tong_loi_nhuan"]
+                        total_orders = kpis["tong_don_hang"]
+                        average_order_value = kpis["gia_tri_don_trung_binh"]
+                        profit_margin = kpis["ty_suat_loi_nhuan"]
 
                         # --- GIAO DIỆN KPI ---
                         st.markdown("### 📈 Các Chỉ Số Chính")
@@ -188,13 +256,15 @@ if uploaded_file is not None:
                         st.markdown("<br>", unsafe_allow_html=True) 
 
                         # --- BIỂU ĐỒ ---
-                        revenue_by_date = df_selection.set_index('ngay_dat_hang').resample('D')['doanh_thu'].sum().reset_index()
+                        revenue_by_date = cube_selection.revenue_by_date()
+                        # Biểu đồ và bảng đều nhận dữ liệu đã tổng hợp / giảm mẫu ở máy chủ, không gửi từng dòng đơn hàng
                         fig_revenue_over_time = px.line(
-                            revenue_by_date, x="ngay_dat_hang", y="doanh_thu", title="<b>Doanh Thu Theo Thời Gian</b>"
+                            downsample_line(revenue_by_date, "ngay_dat_hang", "doanh_thu", LINE_MAX_POINTS),
+                            x="ngay_dat_hang", y="doanh_thu", title="<b>Doanh Thu Theo Thời Gian</b>"
                         )
                         fig_revenue_over_time.update_layout(plot_bgcolor="rgba(0,0,0,0)", xaxis=(dict(showgrid=False)))
 
-                        profit_by_product = df_selection.groupby("ten_san_pham")["loi_nhuan"].sum().sort_values().reset_index()
+                        profit_by_product = cube_selection.profit_by_product()
                         top_5_profit = profit_by_product.tail(5)
                         bottom_5_loss = profit_by_product.head(5)
                         profit_loss_df = pd.concat([bottom_5_loss, top_5_profit])
@@ -210,15 +280,16 @@ if uploaded_file is not None:
                         )
                         
                         fig_pie_chart = px.pie(
-                            df_selection, names="danh_muc", values="doanh_thu",
+                            top_with_other(cube_selection.revenue_by_category(), "danh_muc", "doanh_thu"),
+                            names="danh_muc", values="doanh_thu",
                             title="<b>Tỷ Trọng Doanh Thu Theo Danh Mục</b>"
                         )
                         fig_pie_chart.update_layout(plot_bgcolor="rgba(0,0,0,0)")
                         
-                        st.plotly_chart(fig_revenue_over_time, use_container_width=True)
+                        show_chart(st, fig_revenue_over_time, "Doanh thu theo thời gian")
                         left_column, right_column = st.columns(2)
-                        left_column.plotly_chart(fig_pie_chart, use_container_width=True)
-                        right_column.plotly_chart(fig_top_products, use_container_width=True)
+                        show_chart(left_column, fig_pie_chart, "Tỷ trọng danh mục")
+                        show_chart(right_column, fig_top_products, "Top sản phẩm lãi & lỗ")
 
                         # =========================================================
                         # TÍCH HỢP AI
@@ -231,111 +302,163 @@ if uploaded_file is not None:
                             "🛡️ Kiểm soát rủi ro", 
                             "💰 Tối ưu giá bán", 
                             "📅 Phân tích mùa vụ"
-                        ])
-
-                        with tab1:
-                            st.markdown("#### Dự Báo Doanh Thu 30 Ngày Tiếp Theo")
-                            df_ai = revenue_by_date.copy()
-                            if len(df_ai) > 3:
-                                # Nhận biết Thứ trong tuần
-                                df_ai['ngay_so'] = (df_ai['ngay_dat_hang'] - df_ai['ngay_dat_hang'].min()).dt.days
-                                df_ai['thu_trong_tuan'] = df_ai['ngay_dat_hang'].dt.dayofweek # 0 là Thứ 2, 6 là Chủ nhật
-                                
-                                # AI học dựa trên 2 yếu tố: Thời gian trôi qua + Là thứ mấy
-                                X = df_ai[['ngay_so', 'thu_trong_tuan']]
-                                y = df_ai['doanh_thu']
-                                
-                                model_lr = LinearRegression()
-                                model_lr.fit(X, y)
-                                
-                                # Lên lịch 30 ngày tương lai
-                                future_days = 30
-                                future_dates = [df_ai['ngay_dat_hang'].max() + timedelta(days=i) for i in range(1, future_days + 1)]
-                                
-                                # Tạo dữ liệu cho 30 ngày tương lai
-                                future_X = pd.DataFrame({
-                                    'ngay_so': [(d - df_ai['ngay_dat_hang'].min()).days for d in future_dates],
-                                    'thu_trong_tuan': [d.weekday() for d in future_dates]
-                                })
-                                
-                                future_pred = model_lr.predict(future_X)
-                                
-                                df_future = pd.DataFrame({'ngay_dat_hang': future_dates, 'doanh_thu': future_pred, 'loai': 'Dự báo (AI)'})
-                                df_ai['loai'] = 'Thực tế'
-                                
-                                df_final_lr = pd.concat([df_ai[['ngay_dat_hang', 'doanh_thu', 'loai']], df_future])
-                                
-                                fig_pred = px.line(df_final_lr, x='ngay_dat_hang', y='doanh_thu', color='loai',
-                                                   color_discrete_map={'Thực tế': '#2E86C1', 'Dự báo (AI)': '#E74C3C'},
-                                                   title="<b>Đường dự báo đã được AI học thêm quy luật ngày nghỉ</b>")
-                                fig_pred.update_layout(plot_bgcolor="rgba(0,0,0,0)")
-                                st.plotly_chart(fig_pred, use_container_width=True)
-                            else:
-                                st.warning("Cần nhiều dữ liệu ngày tháng hơn để hệ thống AI có thể học và dự báo.")
-
-                        with tab2:
-                            st.markdown("#### Phát Hiện Giao Dịch Bất Thường")
-                            model_data = df_selection[['so_luong', 'don_gia', 'loi_nhuan']].dropna()
-                            if len(model_data) > 10:
-                                iso_forest = IsolationForest(contamination=0.05, random_state=42)
-                                model_data['anomaly'] = iso_forest.fit_predict(model_data)
-                                anomalies = df_selection.loc[model_data.index[model_data['anomaly'] == -1]]
-                                if not anomalies.empty:
-                                    st.error(f"⚠️ Phát hiện **{len(anomalies)}** giao dịch đáng ngờ.")
-                                    fig_anom = px.scatter(model_data, x='don_gia', y='loi_nhuan', 
-                                                          color=model_data['anomaly'].map({1: 'Bình thường', -1: 'Bất thường'}),
-                                                          color_discrete_map={'Bình thường': '#2E86C1', 'Bất thường': '#E74C3C'})
-                                    st.plotly_chart(fig_anom, use_container_width=True)
-                                    st.dataframe(anomalies[['ma_don_hang', 'ten_san_pham', 'so_luong', 'don_gia', 'loi_nhuan']])
+                        ], key="ai_tabs", on_change="rerun")
+                        model_registry = get_model_registry()
+
+                        # Chỉ tab đang mở mới chạy mô hình; kết quả được ghi nhớ theo dữ liệu huấn luyện + tham số
+                        if tab1.open:
+                            with tab1, profiler.stage("ai: du_bao"):
+                                st.markdown("#### Dự Báo Doanh Thu 30 Ngày Tiếp Theo")
+                                if len(revenue_by_date) > 3:
+                                    forecast = model_registry.get_or_compute(
+                                        'forecast', revenue_by_date, {'future_days': 30},
+                                        lambda: forecast_revenue(revenue_by_date, future_days=30)
+                                    )
+                                    fig_pred = px.line(downsample_line(forecast['forecast'], 'ngay_dat_hang', 'doanh_thu', LINE_MAX_POINTS, by='loai'),
+                                                       x='ngay_dat_hang', y='doanh_thu', color='loai',
+                                                       color_discrete_map={'Thực tế': '#2E86C1', 'Dự báo (AI)': '#E74C3C'},
+                                                       title="<b>Đường dự báo đã được AI học thêm quy luật ngày nghỉ</b>")
+                                    fig_pred.update_layout(plot_bgcolor="rgba(0,0,0,0)")
+                                    show_chart(st, fig_pred, "Dự báo doanh thu")
+                                else:
+                                    st.warning("Cần nhiều dữ liệu ngày tháng hơn để hệ thống AI có thể học và dự báo.")
+
+                                if st.toggle("📦 Dự báo hàng loạt theo từng danh mục & sản phẩm bán chạy", key="batch_forecast"):
+                                    top_n = int(st.number_input("Số sản phẩm bán chạy cần dự báo:", min_value=1, max_value=1000, value=BATCH_TOP_PRODUCTS))
+                                    # Khóa theo nội dung các ô đã chọn: cộng dồn dữ liệu ngoài vùng chọn không làm dự báo phải tính lại
+                                    batch = model_registry.get_or_compute(
+                                        'batch_forecast', cube_selection.labeled_cells(),
+                                        {'top_n': top_n, 'future_days': 30, 'level': 0.95},
+                                        lambda: batch_forecast(cube_selection, top_n=top_n, future_days=30, level=0.95)
+                                    )
+                                    if batch.empty:
+                                        st.warning("Không có chuỗi nào đủ dữ liệu để dự báo.")
+                                    else:
+                                        st.markdown("##### Tổng doanh thu dự báo 30 ngày tới")
+                                        st.dataframe(forecast_summary(batch), hide_index=True)
+                                        with st.expander("Chi tiết theo ngày (khoảng dự báo 95%)"):
+                                            st.dataframe(batch, hide_index=True)
+
+                        if tab2.open:
+                            with tab2, profiler.stage("ai: bat_thuong"):
+                                st.markdown("#### Phát Hiện Giao Dịch Bất Thường")
+                                per_category = st.toggle("Mô hình riêng cho từng danh mục", key="anomaly_per_category")
+                                model_data = df_selection[ANOMALY_FEATURES].dropna() if df_selection is not None else None
+                                if model_data is None:
+                                    st.info(ROWS_NOT_KEPT)
+                                elif len(model_data) > 10:
+                                    # Mô hình học trên toàn bộ dữ liệu (mẫu phân tầng) nên đổi bộ lọc không phải huấn luyện lại
+                                    anomaly_params = {'contamination': 0.05, 'per_category': per_category, 'random_state': 42}
+                                    if store_version is not None:
+                                        anomaly_result = store_anomalies(order_store, store_version, df, anomaly_params)
+                                    else:
+                                        anomaly_result = model_registry.get_or_compute(
+                                            'anomaly_engine', ingest_result.fingerprint, anomaly_params,
+                                            lambda: detect_anomalies(df, **anomaly_params)
+                                        )
+                                    model_data['anomaly'] = anomaly_result['scores']['anomaly'].to_numpy()[score_positions(df, model_data)]
+                                    anomalies = df_selection.loc[model_data.index[model_data['anomaly'] == -1]]
+                                    if not anomalies.empty:
+                                        st.error(f"⚠️ Phát hiện **{len(anomalies)}** giao dịch đáng ngờ.")
+                                        plot_data = scatter_sample(model_data)
+                                        # WebGL vẽ nhanh hơn SVG với hàng chục nghìn điểm
+                                        fig_anom = px.scatter(plot_data, x='don_gia', y='loi_nhuan', render_mode='webgl',
+                                                              color=plot_data['anomaly'].map({1: 'Bình thường', -1: 'Bất thường'}),
+                                                              color_discrete_map={'Bình thường': '#2E86C1', 'Bất thường': '#E74C3C'})
+                                        show_chart(st, fig_anom, "Giao dịch bất thường")
+                                        if len(plot_data) < len(model_data):
+                                            n_plot_anomalies = int((plot_data['anomaly'] == -1).sum())
+                                            st.caption(
+                                                f"Biểu đồ hiển thị {n_plot_anomalies:,} / {len(anomalies):,} điểm bất thường và"
+                                                f" {len(plot_data) - n_plot_anomalies:,} / {len(model_data) - len(anomalies):,} điểm bình thường được lấy mẫu."
+                                            )
+                                        show_table(anomalies[['ma_don_hang', 'ten_san_pham', 'so_luong', 'don_gia', 'loi_nhuan']], "anomalies", "Bảng giao dịch bất thường")
+                                    else:
+                                        st.success("✅ Dữ liệu an toàn, không có điểm bất thường đáng kể.")
+                                else:
+                                    st.warning("Cần ít nhất 10 dòng dữ liệu để chạy thuật toán.")
+
+                        if tab3.open:
+                            with tab3, profiler.stage("ai: toi_uu_gia"):
+                                st.markdown("#### Tìm Mức Giá Để Tối Ưu Lợi Nhuận")
+                                if df_selection is None:
+                                    st.info(ROWS_NOT_KEPT)
+                                else:
+                                    # Bảng giá tối ưu của mọi sản phẩm được tính một lần cho mỗi bộ lọc; chọn sản phẩm chỉ là tra bảng
+                                    price_table = model_registry.get_or_compute(
+                                        'price_optimization', ingest_result.fingerprint,
+                                        {'categories': sorted(map(str, category)), 'start': str(start_date.date()),
+                                         'end': str(end_date.date()), 'n_points': PRICE_POINTS},
+                                        lambda: optimize_prices(df_selection, n_points=PRICE_POINTS)
+                                    )
+                                    selected_product = st.selectbox("Chọn sản phẩm cần phân tích độ nhạy giá:", df_selection['ten_san_pham'].unique())
+                                    product_rows = price_table[price_table['ten_san_pham'] == selected_product]
+                                    if not product_rows.empty:
+                                        test_prices, pred_rev, best_idx = demand_curve(product_rows.iloc[0], n_points=PRICE_POINTS)
+                                        st.success(f"💡 AI Khuyến nghị: Mức giá tối ưu là **₫ {test_prices[best_idx]:,.0f}** mang lại dự kiến **₫ {pred_rev[best_idx]:,.0f}** doanh thu.")
+                                        fig_opt = px.line(x=test_prices, y=pred_rev, labels={'x': 'Giá bán test', 'y': 'Doanh thu dự kiến'})
+                                        fig_opt.add_scatter(x=[test_prices[best_idx]], y=[pred_rev[best_idx]], mode='markers', marker=dict(color='red', size=12))
+                                        show_chart(st, fig_opt, "Đường cong giá")
+                                    else:
+                                        st.warning("Sản phẩm này chưa có đủ sự biến động về giá để vẽ đường cong nhu cầu.")
+
+                                    if not price_table.empty:
+                                        st.markdown("##### Báo Cáo Định Giá Toàn Bộ Sản Phẩm")
+                                        price_report = price_table[PRICE_REPORT_COLUMNS].sort_values('chenh_lech_gia', key=abs, ascending=False)
+                                        st.dataframe(price_report, hide_index=True)
+                                        # Giống nút tải dữ liệu chi tiết: file CSV chỉ được tạo khi bấm tải, không phải mỗi lượt chạy lại
+                                        price_key = ('dinh_gia', ingest_result.fingerprint, tuple(sorted(map(str, category))),
+                                                     str(start_date.date()), str(end_date.date()))
+                                        st.download_button(
+                                            label="📥 Tải báo cáo định giá (CSV)",
+                                            data=deferred_export(price_report, price_key, 'csv'),
+                                            file_name='bao_cao_dinh_gia.csv',
+                                            mime='text/csv',
+                                            on_click="ignore",
+                                        )
+
+                        if tab4.open:
+                            with tab4, profiler.stage("ai: mua_vu"):
+                                st.markdown("#### Phân Rã Dữ Liệu Thời Gian")
+                                df_ts = revenue_by_date.set_index('ngay_dat_hang')
+                                idx = pd.date_range(df_ts.index.min(), df_ts.index.max())
+                                df_ts = df_ts.reindex(idx, fill_value=0)
+                                if len(df_ts) >= 14:
+                                    decomp = model_registry.get_or_compute(
+                                        'seasonal_decompose', df_ts['doanh_thu'], {'model': 'additive', 'period': 7},
+                                        lambda: seasonal_pattern(df_ts['doanh_thu'], period=7)
+                                    )
+                                    # Tín hiệu dao động nên giảm mẫu kiểu min-max để giữ biên độ
+                                    seasonal = decomp['seasonal'].rename_axis('ngay').reset_index()
+                                    seasonal = downsample_line(seasonal, 'ngay', 'seasonal', LINE_MAX_POINTS, method='minmax')
+                                    st.line_chart(seasonal, x='ngay', y='seasonal', height=200)
                                 else:
-                                    st.success("✅ Dữ liệu an toàn, không có điểm bất thường đáng kể.")
-                            else:
-                                st.warning("Cần ít nhất 10 dòng dữ liệu để chạy thuật toán.")
-
-                        with tab3:
-                            st.markdown("#### Tìm Mức Giá Để Tối Ưu Lợi Nhuận")
-                            selected_product = st.selectbox("Chọn sản phẩm cần phân tích độ nhạy giá:", df_selection['ten_san_pham'].unique())
-                            df_prod = df_selection[df_selection['ten_san_pham'] == selected_product]
-                            if len(df_prod['don_gia'].unique()) > 2:
-                                df_price = df_prod.groupby('don_gia')['so_luong'].sum().reset_index()
-                                X_poly_feat = PolynomialFeatures(degree=2)
-                                X_price = X_poly_feat.fit_transform(df_price[['don_gia']])
-                                model_poly = LinearRegression()
-                                model_poly.fit(X_price, df_price['so_luong'])
-                                min_p, max_p = df_price['don_gia'].min() * 0.8, df_price['don_gia'].max() * 1.2
-                                test_prices = np.linspace(min_p, max_p, 50).reshape(-1, 1)
-                                pred_qty = model_poly.predict(X_poly_feat.transform(test_prices))
-                                pred_rev = test_prices.flatten() * pred_qty
-                                best_idx = np.argmax(pred_rev)
-                                st.success(f"💡 AI Khuyến nghị: Mức giá tối ưu là **₫ {test_prices[best_idx][0]:,.0f}** mang lại dự kiến **₫ {pred_rev[best_idx]:,.0f}** doanh thu.")
-                                fig_opt = px.line(x=test_prices.flatten(), y=pred_rev, labels={'x': 'Giá bán test', 'y': 'Doanh thu dự kiến'})
-                                fig_opt.add_scatter(x=[test_prices[best_idx][0]], y=[pred_rev[best_idx]], mode='markers', marker=dict(color='red', size=12))
-                                st.plotly_chart(fig_opt, use_container_width=True)
-                            else:
-                                st.warning("Sản phẩm này chưa có đủ sự biến động về giá để vẽ đường cong nhu cầu.")
-
-                        with tab4:
-                            st.markdown("#### Phân Rã Dữ Liệu Thời Gian")
-                            df_ts = revenue_by_date.set_index('ngay_dat_hang')
-                            idx = pd.date_range(df_ts.index.min(), df_ts.index.max())
-                            df_ts = df_ts.reindex(idx, fill_value=0)
-                            if len(df_ts) >= 14:
-                                decomp = seasonal_decompose(df_ts['doanh_thu'], model='additive', period=7)
-                                st.line_chart(decomp.seasonal, height=200)
-                            else:
-                                st.warning("Cần ít nhất 14 ngày dữ liệu liên tục để tìm ra quy luật mùa vụ.")
+                                    st.warning("Cần ít nhất 14 ngày dữ liệu liên tục để tìm ra quy luật mùa vụ.")
 
                         # --- BẢNG DỮ LIỆU & NÚT TẢI XUỐNG ---
                         st.markdown("### 📋 Dữ liệu chi tiết")
-                        st.dataframe(df_selection)
+                        if df_selection is None:
+                            st.info(ROWS_NOT_KEPT)
+                        else:
+                            show_table(df_selection, "detail", "Bảng dữ liệu chi tiết")
                         
-                        csv_data = convert_df_to_csv(df_selection)
-                        st.download_button(
-                            label="📥 Tải dữ liệu đã lọc (CSV)",
-                            data=csv_data,
-                            file_name='bao_cao_doanh_thu_da_loc.csv',
-                            mime='text/csv',
-                        )
+                            export_format = st.selectbox(
+                                "Định dạng file tải xuống:", list(EXPORT_FORMATS),
+                                format_func=lambda fmt: EXPORT_FORMATS[fmt][0], key="export_format"
+                            )
+                            _, export_ext, export_mime = EXPORT_FORMATS[export_format]
+                            export_key = (ingest_result.fingerprint, tuple(sorted(map(str, category))), str(start_date.date()), str(end_date.date()))
+                            st.download_button(
+                                label=f"📥 Tải dữ liệu đã lọc ({EXPORT_FORMATS[export_format][0]})",
+                                data=deferred_export(df_selection, export_key, export_format),
+                                file_name=f'bao_cao_doanh_thu_da_loc.{export_ext}',
+                                mime=export_mime,
+                                on_click="ignore",
+                            )
+
+                        if render_monitor.enabled:
+                            with st.sidebar.expander("Hiệu năng hiển thị"):
+                                st.dataframe(render_monitor.summary(), hide_index=True)
 
         else:
             st.error(f"""
@@ -382,4 +505,18 @@ else:
     2.  **Tải lên:** Nhìn sang **cột bên trái**, nhấn nút **"Browse files"** để chọn file.
     3.  **Phân tích:** Đợi 1-2 giây, Dashboard sẽ hiện ra.
     4.  **Xuất báo cáo:** Kéo xuống cuối trang để tải file dữ liệu sạch.
-    """)
\ No newline at end of file
+    """)
+
+# --- BẢNG GỠ LỖI: THỜI GIAN / BỘ NHỚ THEO GIAI ĐOẠN, TẢI VỀ DẠNG JSON ---
+if profiler.enabled:
+    profiler.stop()
+    with st.sidebar.expander("🐞 Hiệu năng theo giai đoạn", expanded=True):
+        st.dataframe(profiler.summary(), hide_index=True)
+        st.download_button(
+            label="📥 Tải kết quả đo (JSON)",
+            data=profiler.to_json(file=uploaded_file.name if uploaded_file is not None else None,
+                                  figures=render_monitor.records),
+            file_name='hieu_nang_giai_doan.json',
+            mime='application/json',
+            on_click="ignore",
+        )
\ No newline at end of file
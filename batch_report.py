@@ -0,0 +1,182 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from engine import ANOMALY_CONTAMINATION, ANOMALY_REPORT_COLUMNS, analyze_file
+from export import write_csv
+from forecasting import BATCH_TOP_PRODUCTS, FORECAST_DAYS
+
+
+# =========================================================
+# BÁO CÁO HÀNG LOẠT CHO NHIỀU CHI NHÁNH (KHÔNG CẦN GIAO DIỆN)
+# =========================================================
+# Chạy: python batch_report.py du_lieu_chi_nhanh/ -o bao_cao/ --workers 4
+# Mỗi file CSV/XLSX trong thư mục là một chi nhánh. Mỗi chi nhánh có một thư mục báo cáo riêng:
+#   kpi.json, du_bao_tong.csv, du_bao_chi_tiet.csv, bat_thuong.csv
+# và thư mục gốc có các báo cáo tổng hợp:
+#   tong_hop_kpi.csv, tong_hop_du_bao.csv, tong_hop_bat_thuong.csv
+INPUT_SUFFIXES = ('.csv', '.xlsx')
+TOTAL_LABEL = 'TỔNG'
+
+
+def _inside(path, directory):
+    path, directory = os.path.realpath(path), os.path.realpath(directory)
+    return os.path.commonpath([path, directory]) == directory
+
+
+def find_inputs(input_dir, recursive=False, exclude_dir=None):
+    pattern = os.path.join(input_dir, '**', '*') if recursive else os.path.join(input_dir, '*')
+    # So đuôi không phân biệt hoa thường ('BAO_CAO.XLSX'); bỏ file khóa tạm của Excel (~$ten_file.xlsx)
+    # exclude_dir: thư mục báo cáo (mặc định nằm trong input_dir), không đọc lại báo cáo cũ như một chi nhánh;
+    # bỏ qua nếu chính input_dir nằm trong thư mục báo cáo (-o trùng thư mục dữ liệu), nếu không sẽ loại hết
+    if exclude_dir is not None and _inside(input_dir, exclude_dir):
+        exclude_dir = None
+    return sorted(
+        path for path in glob.glob(pattern, recursive=recursive)
+        if path.lower().endswith(INPUT_SUFFIXES) and os.path.isfile(path)
+        and not os.path.basename(path).startswith('~$')
+        and not (exclude_dir is not None and _inside(path, exclude_dir))
+    )
+
+
+def branch_names(paths):
+    # Tên chi nhánh = tên file không có đuôi; trùng tên (a.csv và a.xlsx) thì giữ cả đuôi
+    stems = [os.path.splitext(os.path.basename(path))[0] for path in paths]
+    return [
+        stem if stems.count(stem) == 1 else os.path.basename(path).replace('.', '_')
+        for stem, path in zip(stems, paths)
+    ]
+
+
+def _write_table(df, path):
+    with open(path, 'wb') as f:
+        write_csv(df, f)
+
+
+def process_file(path, branch, output_dir, options):
+    # Chạy trong tiến trình con: ghi báo cáo của một chi nhánh, trả về tóm tắt nhỏ cho tiến trình chính
+    start = time.perf_counter()
+    summary = {'chi_nhanh': branch, 'file': os.path.basename(path)}
+    try:
+        # Mỗi tiến trình đã là một luồng song song, không để IsolationForest mở thêm luồng
+        report = analyze_file(path, n_jobs=1, **options)
+    except Exception as e:
+        summary.update(trang_thai='loi', loi=str(e), thoi_gian_s=time.perf_counter() - start)
+        return summary
+
+    branch_dir = os.path.join(output_dir, branch)
+    os.makedirs(branch_dir, exist_ok=True)
+    with open(os.path.join(branch_dir, 'kpi.json'), 'w', encoding='utf-8') as f:
+        json.dump(report.kpis, f, ensure_ascii=False, indent=2)
+    if report.forecast is not None:
+        _write_table(report.forecast, os.path.join(branch_dir, 'du_bao_tong.csv'))
+    _write_table(report.batch_forecast, os.path.join(branch_dir, 'du_bao_chi_tiet.csv'))
+    anomalies = report.anomalies
+    if anomalies is None:
+        # Quá ít dòng để chấm điểm: vẫn ghi dòng tiêu đề để file đọc lại được (file rỗng hẳn làm read_csv lỗi)
+        anomalies = pd.DataFrame(columns=ANOMALY_REPORT_COLUMNS + ['diem_bat_thuong'])
+    _write_table(anomalies, os.path.join(branch_dir, 'bat_thuong.csv'))
+
+    summary.update(report.kpis)
+    summary.update(so_giao_dich_bat_thuong=len(anomalies), trang_thai='ok', loi=None,
+                   thoi_gian_s=time.perf_counter() - start)
+    return summary
+
+
+def _read_branch_tables(output_dir, summaries, file_name):
+    for summary in summaries:
+        path = os.path.join(output_dir, summary['chi_nhanh'], file_name)
+        if summary['trang_thai'] == 'ok' and os.path.exists(path) and os.path.getsize(path) > 0:
+            try:
+                table = pd.read_csv(path, encoding='utf-8-sig')
+            except pd.errors.EmptyDataError:
+                # Chỉ có BOM, không có cột nào (báo cáo ghi bởi phiên bản cũ)
+                continue
+            if not table.empty:
+                yield table.assign(chi_nhanh=summary['chi_nhanh'])
+
+
+def write_combined(output_dir, summaries):
+    kpi = pd.DataFrame(summaries)
+    ok = kpi[kpi['trang_thai'] == 'ok']
+    if not ok.empty:
+        revenue, profit, orders = ok['tong_doanh_thu'].sum(), ok['tong_loi_nhuan'].sum(), ok['tong_don_hang'].sum()
+        total = {
+            'chi_nhanh': TOTAL_LABEL, 'trang_thai': 'ok',
+            'tong_doanh_thu': revenue, 'tong_loi_nhuan': profit, 'tong_don_hang': orders,
+            'gia_tri_don_trung_binh': revenue / orders if orders > 0 else 0,
+            'ty_suat_loi_nhuan': profit / revenue * 100 if revenue > 0 else 0,
+            'so_giao_dich_bat_thuong': ok['so_giao_dich_bat_thuong'].sum(),
+        }
+        kpi = pd.concat([kpi, pd.DataFrame([total])], ignore_index=True)
+    _write_table(kpi, os.path.join(output_dir, 'tong_hop_kpi.csv'))
+
+    # Dự báo tổng: từng chi nhánh + tổng các chi nhánh theo ngày. Mỗi chi nhánh dự báo tiếp từ ngày cuối của
+    # riêng nó nên chỉ cộng những ngày mọi chi nhánh đều có dự báo; ngày thiếu chi nhánh nào sẽ bị bỏ
+    forecasts = list(_read_branch_tables(output_dir, summaries, 'du_bao_tong.csv'))
+    if forecasts:
+        forecast = pd.concat(forecasts, ignore_index=True)
+        predicted = forecast[forecast['loai'] != 'Thực tế']
+        by_date = predicted.groupby('ngay_dat_hang').agg(
+            doanh_thu=('doanh_thu', 'sum'), so_chi_nhanh=('chi_nhanh', 'nunique')
+        )
+        all_branches = (
+            by_date[by_date['so_chi_nhanh'] == predicted['chi_nhanh'].nunique()]
+            .reset_index()[['ngay_dat_hang', 'doanh_thu']]
+            .assign(loai='Dự báo (AI)', chi_nhanh=TOTAL_LABEL)
+        )
+        _write_table(pd.concat([forecast, all_branches], ignore_index=True),
+                     os.path.join(output_dir, 'tong_hop_du_bao.csv'))
+
+    anomalies = list(_read_branch_tables(output_dir, summaries, 'bat_thuong.csv'))
+    if anomalies:
+        _write_table(pd.concat(anomalies, ignore_index=True), os.path.join(output_dir, 'tong_hop_bat_thuong.csv'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Xuất báo cáo KPI, dự báo và giao dịch bất thường cho nhiều chi nhánh')
+    parser.add_argument('input_dir', help='Thư mục chứa các file CSV/XLSX của từng chi nhánh')
+    parser.add_argument('-o', '--output-dir', default=None, help='Mặc định: <input_dir>/bao_cao')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Số tiến trình chạy song song')
+    parser.add_argument('--recursive', action='store_true', help='Tìm file trong cả các thư mục con')
+    parser.add_argument('--future-days', type=int, default=FORECAST_DAYS)
+    parser.add_argument('--top-n', type=int, default=BATCH_TOP_PRODUCTS, help='Số sản phẩm bán chạy được dự báo riêng')
+    parser.add_argument('--contamination', type=float, default=ANOMALY_CONTAMINATION)
+    args = parser.parse_args(argv)
+
+    output_dir = args.output_dir or os.path.join(args.input_dir, 'bao_cao')
+    paths = find_inputs(args.input_dir, args.recursive, exclude_dir=output_dir)
+    if not paths:
+        print(f'Không tìm thấy file CSV/XLSX nào trong {args.input_dir}', file=sys.stderr)
+        return 1
+    os.makedirs(output_dir, exist_ok=True)
+    options = {'future_days': args.future_days, 'top_n': args.top_n, 'contamination': args.contamination}
+
+    start = time.perf_counter()
+    summaries = []
+    with ProcessPoolExecutor(max_workers=max(1, min(args.workers, len(paths)))) as pool:
+        futures = [
+            pool.submit(process_file, path, branch, output_dir, options)
+            for path, branch in zip(paths, branch_names(paths))
+        ]
+        for done, future in enumerate(as_completed(futures), 1):
+            summary = future.result()
+            summaries.append(summary)
+            status = 'OK' if summary['trang_thai'] == 'ok' else f"LỖI: {summary['loi']}"
+            print(f"[{done}/{len(paths)}] {summary['file']} ({summary['thoi_gian_s']:.1f}s) {status}")
+
+    summaries.sort(key=lambda summary: summary['chi_nhanh'])
+    write_combined(output_dir, summaries)
+    failed = [summary for summary in summaries if summary['trang_thai'] != 'ok']
+    print(f"Xong {len(paths) - len(failed)}/{len(paths)} file trong {time.perf_counter() - start:.1f}s -> {output_dir}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,64 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+from anomaly import scatter_sample
+from charts import LINE_MAX_POINTS, downsample_line, figure_payload_bytes, top_with_other
+
+
+# =========================================================
+# DUNG LƯỢNG GỬI LÊN TRÌNH DUYỆT: DỮ LIỆU THÔ so với TỔNG HỢP / GIẢM MẪU Ở MÁY CHỦ
+# =========================================================
+# Chạy: python -m benchmarks.bench_charts --rows 10000 100000 1000000
+def make_orders(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'ngay_dat_hang': pd.Timestamp('2015-01-01') + pd.to_timedelta(rng.integers(0, 3_650, n_rows), unit='D'),
+        'danh_muc': pd.Categorical(rng.choice(['Điện tử', 'Thời trang', 'Gia dụng', 'Sách'], n_rows)),
+        'don_gia': rng.uniform(1e4, 2e7, n_rows).round(-3),
+        'loi_nhuan': rng.normal(1e5, 5e5, n_rows),
+        'doanh_thu': rng.uniform(1e4, 5e7, n_rows),
+        'anomaly': np.where(rng.random(n_rows) < 0.05, -1, 1),
+    })
+
+
+def measure(build):
+    start = time.perf_counter()
+    fig = build()
+    n_bytes = figure_payload_bytes(fig)
+    return n_bytes / 1024**2, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark dung lượng biểu đồ')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'Số dòng':>10} {'biểu đồ':>12} {'thô (MB)':>10} {'thô (ms)':>10} {'mới (MB)':>10} {'mới (ms)':>10}")
+    for n_rows in args.rows:
+        df = make_orders(n_rows)
+        # Đường doanh thu theo giờ để số điểm tăng theo số dòng
+        by_hour = (df.assign(ngay_dat_hang=df['ngay_dat_hang'] + pd.to_timedelta(np.arange(n_rows) % 24, unit='h'))
+                   .groupby('ngay_dat_hang', as_index=False)['doanh_thu'].sum())
+        by_category = df.groupby('danh_muc', observed=True, as_index=False)['doanh_thu'].sum()
+        cases = {
+            'tròn': (lambda: px.pie(df, names='danh_muc', values='doanh_thu'),
+                     lambda: px.pie(top_with_other(by_category, 'danh_muc', 'doanh_thu'), names='danh_muc', values='doanh_thu')),
+            'đường': (lambda: px.line(by_hour, x='ngay_dat_hang', y='doanh_thu'),
+                      lambda: px.line(downsample_line(by_hour, 'ngay_dat_hang', 'doanh_thu', LINE_MAX_POINTS),
+                                      x='ngay_dat_hang', y='doanh_thu')),
+            'phân tán': (lambda: px.scatter(df, x='don_gia', y='loi_nhuan', color='anomaly'),
+                         lambda: px.scatter(scatter_sample(df), x='don_gia', y='loi_nhuan', color='anomaly',
+                                            render_mode='webgl')),
+        }
+        for name, (raw, new) in cases.items():
+            raw_mb, raw_ms = measure(raw)
+            new_mb, new_ms = measure(new)
+            print(f"{n_rows:>10,} {name:>12} {raw_mb:>10.2f} {raw_ms:>10.0f} {new_mb:>10.2f} {new_ms:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from export import EXPORT_FORMATS, export_frame
+
+
+# =========================================================
+# XUẤT FILE: BỘ NHỚ ĐỈNH VÀ THỜI GIAN, SO VỚI to_csv().encode() TRONG BỘ NHỚ
+# =========================================================
+# Chạy: python -m benchmarks.bench_export --rows 100000 500000 --formats csv csv.gz parquet
+# (tracemalloc làm chậm đáng kể; thời gian chỉ để so sánh tương đối. xlsx rất chậm nên không chạy mặc định)
+def make_orders(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'ngay_dat_hang': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365, n_rows), unit='D'),
+        'ma_don_hang': pd.array([f'DH-{i}' for i in range(n_rows)], dtype='string'),
+        'ten_san_pham': pd.Categorical(rng.choice([f'SP {i}' for i in range(500)], n_rows)),
+        'danh_muc': pd.Categorical(rng.choice(['Điện tử', 'Thời trang', 'Gia dụng', 'Sách'], n_rows)),
+        'so_luong': rng.integers(1, 10, n_rows),
+        'don_gia': rng.uniform(1e4, 2e7, n_rows).round(-3),
+        'doanh_thu': rng.uniform(1e4, 5e7, n_rows),
+    })
+
+
+def measure(run):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, peak / 1024**2, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark xuất file theo khúc')
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 500_000])
+    parser.add_argument('--formats', nargs='+', default=['csv', 'csv.gz', 'parquet'], choices=list(EXPORT_FORMATS))
+    args = parser.parse_args()
+
+    print(f"{'Số dòng':>10} {'định dạng':>12} {'file (MB)':>10} {'đỉnh RAM (MB)':>14} {'thời gian (s)':>14}")
+    for n_rows in args.rows:
+        df = make_orders(n_rows)
+        data, peak, elapsed = measure(lambda: df.to_csv(index=False).encode('utf-8-sig'))
+        print(f"{n_rows:>10,} {'csv (cũ)':>12} {len(data) / 1024**2:>10.1f} {peak:>14.1f} {elapsed:>14.2f}")
+        del data
+        for fmt in args.formats:
+            export, peak, elapsed = measure(lambda: export_frame(df, fmt))
+            print(f"{n_rows:>10,} {fmt:>12} {export.size / 1024**2:>10.1f} {peak:>14.1f} {elapsed:>14.2f}")
+            export.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from filtering import FilterIndex, sort_by_date
+
+
+# =========================================================
+# SO SÁNH BỘ LỌC: DataFrame.query vs FilterIndex
+# =========================================================
+# Chạy: python -m benchmarks.bench_filtering --rows 100000 1000000 10000000
+CATEGORIES = ['Điện tử', 'Thời trang', 'Gia dụng', 'Sách', 'Mỹ phẩm', 'Thực phẩm', 'Đồ chơi', 'Thể thao']
+
+
+def make_frame(n_rows, n_days=730, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, n_days, n_rows), unit='D')
+    return pd.DataFrame({
+        'ngay_dat_hang': dates,
+        'danh_muc': pd.Categorical.from_codes(rng.integers(0, len(CATEGORIES), n_rows), CATEGORIES),
+        'doanh_thu': rng.random(n_rows) * 1_000_000,
+    })
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def run(n_rows, repeat):
+    df = sort_by_date(make_frame(n_rows))
+    index = FilterIndex(df)
+    category = CATEGORIES[:3]
+    start_date = df['ngay_dat_hang'].iloc[len(df) // 4]
+    end_date = df['ngay_dat_hang'].iloc[len(df) * 3 // 4]
+    end_exclusive = end_date + pd.Timedelta(days=1)
+
+    scope = {'category': category, 'start_date': start_date, 'end_exclusive': end_exclusive}
+    query_time, expected = best_of(
+        lambda: df.query(
+            "danh_muc == @category & ngay_dat_hang >= @start_date & ngay_dat_hang < @end_exclusive",
+            local_dict=scope,
+        ),
+        repeat,
+    )
+    index_time, selected = best_of(lambda: index.select(category, start_date, end_date), repeat)
+    all_time, _ = best_of(lambda: index.select(CATEGORIES, start_date, end_date), repeat)
+    assert len(expected) == len(selected)
+    return query_time, index_time, all_time, len(selected)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark bộ lọc ngày/danh mục')
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'Số dòng':>12} {'query (ms)':>12} {'index (ms)':>12} {'tăng tốc':>9} {'tất cả DM (ms)':>15} {'dòng khớp':>12}")
+    for n_rows in args.rows:
+        query_time, index_time, all_time, matched = run(n_rows, args.repeat)
+        print(
+            f"{n_rows:>12,} {query_time * 1000:>12.2f} {index_time * 1000:>12.2f}"
+            f" {query_time / index_time:>8.1f}x {all_time * 1000:>15.3f} {matched:>12,}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+
+from forecasting import FORECAST_DAYS, design_matrix, fit_batch, predict_batch
+
+
+# =========================================================
+# THÔNG LƯỢNG DỰ BÁO HÀNG LOẠT (SỐ CHUỖI / GIÂY)
+# =========================================================
+# Chạy: python -m benchmarks.bench_forecasting --series 100 1000 10000 --days 365
+def make_series(n_series, n_days, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_days)
+    weekday = (t + 0) % 7
+    level = rng.uniform(1e5, 1e7, (n_series, 1))
+    trend = rng.normal(0, 1e3, (n_series, 1))
+    Y = level + trend * t + rng.normal(0, 1e4, (n_series, 1)) * weekday + rng.normal(0, 1e5, (n_series, n_days))
+    # Mỗi chuỗi bắt đầu bán ở một ngày khác nhau
+    first_col = rng.integers(0, n_days // 2, n_series)
+    W = (t[None, :] >= first_col[:, None]).astype('float64')
+    return Y * W, W
+
+
+def run_batch(Y, W, X, X_future):
+    coef, XtX_inv, sigma2, dof = fit_batch(Y, W, X)
+    return predict_batch(coef, XtX_inv, sigma2, dof, X_future)
+
+
+def run_loop(Y, W, X, X_future):
+    results = []
+    for y, w in zip(Y, W):
+        mask = w > 0
+        model = LinearRegression().fit(X[mask, 1:], y[mask])
+        results.append(model.predict(X_future[:, 1:]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark dự báo hàng loạt')
+    parser.add_argument('--series', type=int, nargs='+', default=[100, 1_000, 10_000])
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--loop-limit', type=int, default=200,
+                        help='Số chuỗi tối đa chạy theo kiểu vòng lặp LinearRegression để so sánh')
+    args = parser.parse_args()
+
+    grid = pd.date_range('2024-01-01', periods=args.days, freq='D')
+    future = pd.date_range(grid[-1] + pd.Timedelta(days=1), periods=FORECAST_DAYS, freq='D')
+    X, X_future = design_matrix(grid, grid[0]), design_matrix(future, grid[0])
+
+    print(f"{'Số chuỗi':>10} {'lô (s)':>10} {'chuỗi/giây (lô)':>17} {'chuỗi/giây (vòng lặp)':>23}")
+    for n_series in args.series:
+        Y, W = make_series(n_series, args.days)
+        start = time.perf_counter()
+        run_batch(Y, W, X, X_future)
+        batch_time = time.perf_counter() - start
+
+        n_loop = min(n_series, args.loop_limit)
+        start = time.perf_counter()
+        run_loop(Y[:n_loop], W[:n_loop], X, X_future)
+        loop_rate = n_loop / (time.perf_counter() - start)
+        print(f"{n_series:>10,} {batch_time:>10.3f} {n_series / batch_time:>17,.0f} {loop_rate:>23,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import io
+import time
+
+from openpyxl import Workbook
+
+from benchmarks.synthetic import HEADER_VARIANTS
+from headers import CANONICAL_COLUMNS, column_scores, header_scores, resolve_headers, simple_normalize
+from ingestion import read_excel_streaming
+
+
+# =========================================================
+# NHẬN DIỆN TIÊU ĐỀ: BẢNG RỘNG, NHIỀU SHEET, TIÊU ĐỀ KHÔNG NẰM Ở DÒNG ĐẦU
+# =========================================================
+# Chạy: python -m benchmarks.bench_headers --columns 100 500 2000
+TITLE_ROWS = ['BÁO CÁO BÁN HÀNG CHI TIẾT', None, 'Kỳ báo cáo: 01/2024 - 12/2024']
+# Tên cột gần đúng (có đơn vị trong ngoặc, lỗi chính tả, viết liền) mà bảng tra chính xác không nhận ra
+FUZZY_HEADER = ['Ngày đặt hàng (dd/mm/yyyy)', 'OrderID', 'Tên sản phảm', 'Danh mụcc', 'SL', 'Đơn giá (VNĐ)',
+                'Chi phi/don vi']
+
+
+def wide_header(n_columns, variant):
+    base = [names[variant % len(names)] for names in HEADER_VARIANTS.values()] if variant >= 0 else FUZZY_HEADER
+    return base + [f'Chỉ tiêu phụ {i}' for i in range(n_columns - len(base))]
+
+
+def make_workbook(n_columns, n_sheets, n_rows):
+    wb = Workbook(write_only=True)
+    for sheet in range(n_sheets):
+        ws = wb.create_sheet(f'T{sheet + 1}')
+        for row in TITLE_ROWS[:sheet % (len(TITLE_ROWS) + 1)]:
+            ws.append([row])
+        ws.append(wide_header(n_columns, sheet - 1))
+        for i in range(n_rows):
+            ws.append(['01/02/2024', f'DH{sheet}-{i}', 'SP 1', 'Sách', 1, 100_000, 60_000]
+                      + [0] * (n_columns - len(CANONICAL_COLUMNS)))
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def clear_caches():
+    for cached in (simple_normalize, header_scores, column_scores):
+        cached.cache_clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark nhận diện tên cột')
+    parser.add_argument('--columns', type=int, nargs='+', default=[100, 500, 2000])
+    parser.add_argument('--sheets', type=int, default=4)
+    parser.add_argument('--rows', type=int, default=200, help='Số dòng dữ liệu mỗi sheet')
+    args = parser.parse_args()
+
+    print(f"{'Số cột':>8} {'lần đầu (ms)':>13} {'đã ghi nhớ (ms)':>16} {'đọc xlsx (ms)':>14} {'nhận ra':>8}")
+    for n_columns in args.columns:
+        header = wide_header(n_columns, -1)
+        clear_caches()
+        start = time.perf_counter()
+        resolve_headers(header)
+        cold_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        resolved = resolve_headers(header)
+        warm_ms = (time.perf_counter() - start) * 1000
+
+        data = make_workbook(n_columns, args.sheets, args.rows)
+        clear_caches()
+        start = time.perf_counter()
+        df = read_excel_streaming(io.BytesIO(data))
+        read_ms = (time.perf_counter() - start) * 1000
+        found = len(set(resolved) & set(CANONICAL_COLUMNS))
+        assert set(CANONICAL_COLUMNS) <= set(df.columns) and len(df) == args.sheets * args.rows
+        print(f"{n_columns:>8,} {cold_ms:>13.1f} {warm_ms:>16.2f} {read_ms:>14.0f} {found:>6}/{len(CANONICAL_COLUMNS)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+import argparse
+import json
+import os
+import subprocess
+import time
+
+import pandas as pd
+
+from ai_models import detect_anomalies
+from benchmarks.synthetic import DATE_FORMATS, make_sales, to_csv_bytes, to_xlsx_bytes
+from export import export_frame
+from forecasting import batch_forecast
+from ingestion import load_dataset
+from pricing import optimize_prices
+from profiling import StageProfiler
+from storage import CACHE_DIR
+
+
+# =========================================================
+# BENCHMARK TOÀN BỘ LUỒNG XỬ LÝ (KHÔNG GIAO DIỆN) + THEO DÕI SUY GIẢM THÔNG LƯỢNG
+# =========================================================
+# Chạy: python -m benchmarks.bench_pipeline --rows 10000 100000 1000000 [--fail-on-regression]
+# Mỗi lần chạy ghi thêm vào file lịch sử (JSON lines); thông lượng từng giai đoạn được so với
+# trung vị của các lần chạy trước cùng quy mô, giảm quá --tolerance thì bị đánh dấu suy giảm.
+HISTORY_PATH = os.path.join(CACHE_DIR, 'benchmarks', 'pipeline_history.jsonl')
+BASELINE_RUNS = 5
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_pipeline(data, file_name, profiler, models=True):
+    with profiler.stage('ingestion'):
+        result = load_dataset(data, file_name, profiler=profiler)
+    df = result.df
+    categories = list(pd.unique(df['danh_muc']))[:3]
+    start_date = df['ngay_dat_hang'].iloc[len(df) // 4].normalize()
+    end_date = df['ngay_dat_hang'].iloc[len(df) * 3 // 4].normalize()
+    with profiler.stage('filtering', rows=len(df)):
+        df_selection = result.filter_index.select(categories, start_date, end_date)
+        cube_selection = result.cube.select(categories, start_date, end_date)
+    with profiler.stage('kpi'):
+        cube_selection.totals()
+        cube_selection.order_count()
+        cube_selection.revenue_by_date()
+        cube_selection.profit_by_product()
+        cube_selection.revenue_by_category()
+    if models:
+        with profiler.stage('batch_forecast'):
+            batch_forecast(cube_selection)
+        with profiler.stage('optimize_prices', rows=len(df_selection)):
+            optimize_prices(df_selection)
+        with profiler.stage('detect_anomalies', rows=len(df)):
+            detect_anomalies(df)
+    with profiler.stage('export_csv', rows=len(df_selection)):
+        export_frame(df_selection, 'csv').close()
+    return len(df)
+
+
+def baseline(history, rows, file_format, stage):
+    previous = [
+        record['rows_per_s'] for record in history
+        if record['rows'] == rows and record['format'] == file_format and record['stage'] == stage
+    ][-BASELINE_RUNS:]
+    return float(pd.Series(previous).median()) if previous else None
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark luồng xử lý dữ liệu bán hàng giả lập')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--format', choices=['csv', 'xlsx'], default='csv')
+    parser.add_argument('--date-format', choices=DATE_FORMATS, default=None,
+                        help='Mặc định: đổi định dạng ngày theo từng quy mô')
+    parser.add_argument('--products', type=int, default=500)
+    parser.add_argument('--no-models', action='store_true', help='Bỏ qua dự báo, tối ưu giá và phát hiện bất thường')
+    parser.add_argument('--trace-memory', action='store_true', help='Đo bộ nhớ bằng tracemalloc (chậm hơn nhiều)')
+    parser.add_argument('--history', default=HISTORY_PATH)
+    parser.add_argument('--no-record', action='store_true', help='Không ghi kết quả vào file lịch sử')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Mức giảm thông lượng tối đa cho phép (0.2 = 20%%)')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    history = load_history(args.history)
+    revision = git_revision()
+    timestamp = time.strftime('%Y-%m-%dT%H:%M:%S')
+    records, regressions = [], []
+    print(f"{'Số dòng':>10} {'giai đoạn':<28} {'thời gian (s)':>13} {'dòng/giây':>14} {'so với trước':>13}")
+    for i, n_rows in enumerate(args.rows):
+        raw = make_sales(n_rows, n_products=args.products, date_format=args.date_format, seed=i)
+        data = to_xlsx_bytes(raw) if args.format == 'xlsx' else to_csv_bytes(raw)
+        del raw
+        profiler = StageProfiler(trace_memory=args.trace_memory)
+        run_pipeline(data, f'ban_hang.{args.format}', profiler, models=not args.no_models)
+        profiler.stop()
+        for stage in profiler.records:
+            name = '  ' * stage['cap'] + stage['giai_doan']
+            seconds = stage['thoi_gian_ms'] / 1000
+            # Thông lượng luôn tính theo số dòng của file để các quy mô so sánh được với nhau
+            rows_per_s = n_rows / seconds if seconds > 0 else float('inf')
+            previous = baseline(history, n_rows, args.format, stage['giai_doan'])
+            change = ''
+            if previous:
+                ratio = rows_per_s / previous - 1
+                change = f'{ratio:+.0%}'
+                if ratio < -args.tolerance:
+                    change += ' ⚠'
+                    regressions.append((n_rows, stage['giai_doan'], ratio))
+            print(f"{n_rows:>10,} {name:<28} {seconds:>13.3f} {rows_per_s:>14,.0f} {change:>13}")
+            records.append({
+                'timestamp': timestamp, 'revision': revision, 'rows': n_rows, 'format': args.format,
+                'stage': stage['giai_doan'], 'seconds': seconds, 'rows_per_s': rows_per_s,
+                'peak_mb': stage['bo_nho_dinh_mb'],
+            })
+
+    if not args.no_record:
+        os.makedirs(os.path.dirname(args.history), exist_ok=True)
+        with open(args.history, 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    if regressions:
+        print(f"\nSuy giảm thông lượng hơn {args.tolerance:.0%} so với trung vị {BASELINE_RUNS} lần chạy trước:")
+        for n_rows, stage, ratio in regressions:
+            print(f"  {n_rows:,} dòng · {stage}: {ratio:+.0%}")
+        if args.fail_on_regression:
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+from sklearn.preprocessing import PolynomialFeatures
+
+from pricing import PRICE_POINTS, optimize_prices
+
+
+# =========================================================
+# TỐI ƯU GIÁ TOÀN BỘ SẢN PHẨM: MỘT LẦN GIẢI so với VÒNG LẶP TỪNG SẢN PHẨM
+# =========================================================
+# Chạy: python -m benchmarks.bench_pricing --products 100 1000 10000 --rows-per-product 200
+def make_sales(n_products, rows_per_product, seed=0):
+    rng = np.random.default_rng(seed)
+    product = np.repeat(np.arange(n_products), rows_per_product)
+    base_price = rng.uniform(2e4, 2e7, n_products)
+    # Mỗi sản phẩm có vài mức giá (khuyến mãi) quanh giá gốc
+    level = rng.integers(0, 5, len(product))
+    price = np.round(base_price[product] * (0.8 + 0.1 * level), -3)
+    demand = np.maximum(1, rng.poisson(20 - 3 * level))
+    return pd.DataFrame({
+        'ten_san_pham': pd.Categorical([f'SP {i}' for i in product]),
+        'don_gia': price,
+        'so_luong': demand,
+    })
+
+
+def run_loop(df, n_points=PRICE_POINTS):
+    best = {}
+    for product, part in df.groupby('ten_san_pham', observed=True):
+        by_price = part.groupby('don_gia')['so_luong'].sum().reset_index()
+        if len(by_price) <= 2:
+            continue
+        poly = PolynomialFeatures(degree=2)
+        model = LinearRegression().fit(poly.fit_transform(by_price[['don_gia']].to_numpy()), by_price['so_luong'])
+        test_prices = np.linspace(by_price['don_gia'].min() * 0.8, by_price['don_gia'].max() * 1.2, n_points)
+        pred_rev = test_prices * model.predict(poly.transform(test_prices.reshape(-1, 1)))
+        best[product] = test_prices[np.argmax(pred_rev)]
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark tối ưu giá hàng loạt')
+    parser.add_argument('--products', type=int, nargs='+', default=[100, 1_000, 10_000])
+    parser.add_argument('--rows-per-product', type=int, default=200)
+    parser.add_argument('--loop-limit', type=int, default=1_000,
+                        help='Số sản phẩm tối đa chạy theo kiểu vòng lặp sklearn để so sánh')
+    args = parser.parse_args()
+
+    print(f"{'Sản phẩm':>10} {'lô (s)':>10} {'SP/giây (lô)':>14} {'SP/giây (vòng lặp)':>20}")
+    for n_products in args.products:
+        df = make_sales(n_products, args.rows_per_product)
+        start = time.perf_counter()
+        optimize_prices(df)
+        batch_time = time.perf_counter() - start
+
+        n_loop = min(n_products, args.loop_limit)
+        part = make_sales(n_loop, args.rows_per_product)
+        start = time.perf_counter()
+        run_loop(part)
+        loop_rate = n_loop / (time.perf_counter() - start)
+        print(f"{n_products:>10,} {batch_time:>10.3f} {n_products / batch_time:>14,.0f} {loop_rate:>20,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+
+# =========================================================
+# DỮ LIỆU BÁN HÀNG TIẾNG VIỆT GIẢ LẬP (TÊN CỘT VÀ ĐỊNH DẠNG NGÀY "BẨN" NHƯ FILE THẬT)
+# =========================================================
+CATALOGUE = {
+    'Điện tử': ['Điện thoại', 'Tai nghe', 'Sạc dự phòng', 'Loa Bluetooth', 'Máy tính bảng', 'Đồng hồ thông minh'],
+    'Thời trang': ['Áo thun', 'Quần jean', 'Váy liền', 'Áo khoác', 'Giày thể thao', 'Túi xách'],
+    'Gia dụng': ['Nồi cơm điện', 'Ấm siêu tốc', 'Quạt đứng', 'Máy xay sinh tố', 'Chảo chống dính'],
+    'Sách': ['Tiểu thuyết', 'Sách thiếu nhi', 'Sách kỹ năng', 'Truyện tranh', 'Giáo trình'],
+    'Mỹ phẩm': ['Sữa rửa mặt', 'Kem chống nắng', 'Son môi', 'Nước hoa hồng', 'Dầu gội'],
+    'Thực phẩm': ['Cà phê', 'Trà xanh', 'Bánh quy', 'Nước mắm', 'Gạo ST25'],
+    'Đồ chơi': ['Xếp hình', 'Búp bê', 'Xe điều khiển', 'Bộ đồ hàng'],
+    'Thể thao': ['Vợt cầu lông', 'Thảm yoga', 'Bóng đá', 'Tạ tay', 'Xe đạp'],
+}
+# Mỗi cột chuẩn có nhiều cách đặt tên mà headers.COLUMN_ALIASES phải nhận ra được
+HEADER_VARIANTS = {
+    'ngay_dat_hang': ['Ngày đặt hàng', 'Ngày Đặt', 'Order Date', 'Ngày hàng', ' NGÀY ĐẶT HÀNG '],
+    'ma_don_hang': ['Mã đơn hàng', 'Mã ĐH', 'Order ID', 'Mã đơn'],
+    'ten_san_pham': ['Tên sản phẩm', 'Tên SP', 'Product Name'],
+    'danh_muc': ['Danh mục', 'Category', 'Phân loại'],
+    'so_luong': ['Số lượng', 'SL', 'Quantity', 'SoLuong'],
+    'don_gia': ['Đơn giá', 'Giá bán', 'Price', 'DonGia'],
+    'chi_phi': ['Chi phí', 'Giá vốn', 'Cost', 'Giá gốc'],
+}
+DATE_FORMATS = ['%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y', '%d/%m/%Y %H:%M', '%Y/%m/%d']
+# Các giá trị ngày hỏng thường gặp; các dòng này bị loại khi xử lý
+BAD_DATES = ['', 'không rõ', '32/13/2024', 'N/A']
+
+
+def make_sales(n_rows, n_products=500, n_days=730, date_format=None, bad_date_ratio=0.001, seed=0):
+    rng = np.random.default_rng(seed)
+    categories = list(CATALOGUE)
+    # Danh mục sản phẩm: tên gốc + mã mẫu, mỗi sản phẩm thuộc một danh mục và có giá gốc riêng
+    product_category = rng.integers(0, len(categories), n_products)
+    product_names = [
+        f"{rng.choice(CATALOGUE[categories[c]])} {chr(65 + i % 26)}{i}" for i, c in enumerate(product_category)
+    ]
+    base_price = np.round(rng.lognormal(12, 1.2, n_products), -3) + 1_000
+    margin = rng.uniform(0.05, 0.45, n_products)
+
+    # Doanh số tập trung vào một số sản phẩm bán chạy
+    popularity = rng.zipf(1.3, n_products).astype('float64')
+    product = rng.choice(n_products, n_rows, p=popularity / popularity.sum())
+    # Vài mức giá khuyến mãi quanh giá gốc để tab tối ưu giá có dữ liệu
+    discount = rng.choice([1.0, 1.0, 1.0, 0.95, 0.9, 0.8], n_rows)
+    price = np.round(base_price[product] * discount, -2)
+    day = rng.integers(0, n_days, n_rows)
+    # Nhiều dòng có chung một đơn hàng (trung bình ~2 sản phẩm / đơn)
+    order = np.sort(rng.integers(0, max(1, n_rows // 2), n_rows))
+
+    if date_format is None:
+        date_format = DATE_FORMATS[seed % len(DATE_FORMATS)]
+    days = pd.Timestamp('2024-01-01') + pd.to_timedelta(np.arange(n_days), unit='D')
+    if '%H' in date_format:
+        days = days + pd.to_timedelta(rng.integers(8, 22, n_days), unit='h')
+    # Định dạng chuỗi cho từng ngày duy nhất rồi lấy theo chỉ số: nhanh hơn strftime từng dòng
+    day_strings = np.asarray(days.strftime(date_format), dtype=object)
+    dates = day_strings[day]
+    n_bad = int(n_rows * bad_date_ratio)
+    if n_bad:
+        dates[rng.choice(n_rows, n_bad, replace=False)] = rng.choice(BAD_DATES, n_bad)
+
+    headers = {col: rng.choice(variants) for col, variants in HEADER_VARIANTS.items()}
+    return pd.DataFrame({
+        headers['ngay_dat_hang']: dates,
+        headers['ma_don_hang']: 'DH-' + pd.Series(order).astype(str),
+        headers['ten_san_pham']: np.asarray(product_names, dtype=object)[product],
+        headers['danh_muc']: np.asarray(categories, dtype=object)[product_category[product]],
+        headers['so_luong']: rng.integers(1, 6, n_rows),
+        headers['don_gia']: price,
+        headers['chi_phi']: np.round(price * (1 - margin[product]), -2),
+        # Cột thừa thường có trong file xuất từ phần mềm bán hàng
+        'Ghi chú': rng.choice(['', 'Giao nhanh', 'Khách quen', 'Đổi size'], n_rows),
+    })
+
+
+def to_csv_bytes(df):
+    return df.to_csv(index=False).encode('utf-8')
+
+
+def to_xlsx_bytes(df):
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False, engine='openpyxl')
+    return buffer.getvalue()
@@ -0,0 +1,142 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+# --- ƯỚC LƯỢNG DUNG LƯỢNG BỘ NHỚ CỦA MỘT GIÁ TRỊ ---
+def estimate_size(value):
+    if value is None:
+        return 0
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value.values())
+    return sys.getsizeof(value)
+
+
+# --- BỘ NHỚ ĐỆM LRU GIỚI HẠN THEO DUNG LƯỢNG (VÀ THỜI GIAN SỐNG NẾU CÓ ttl) ---
+# on_evict(value): gọi khi một giá trị bị bộ nhớ đệm bỏ đi (bị đẩy ra, hết hạn, bị ghi đè, clear)
+# để giải phóng tài nguyên như file tạm; không gọi với pop vì giá trị được trả lại cho người gọi
+class LRUCache:
+    def __init__(self, max_bytes, max_entries=None, sizeof=estimate_size, ttl=None, on_evict=None):
+        self.max_bytes = int(max_bytes)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._sizeof = sizeof
+        self._on_evict = on_evict
+        self._data = OrderedDict()
+        self._sizes = {}
+        self._expires = {}
+        self._lock = threading.RLock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            self._expire()
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        size = self._sizeof(value)
+        with self._lock:
+            if key in self._data:
+                old = self._data[key]
+                self._remove(key)
+                if old is not value:
+                    self._dispose(old)
+            # Giá trị lớn hơn cả ngân sách thì không lưu, tránh đẩy hết mọi thứ ra ngoài
+            if size > self.max_bytes:
+                return False
+            self._data[key] = value
+            self._sizes[key] = size
+            if self.ttl is not None:
+                self._expires[key] = time.monotonic() + self.ttl
+            self.current_bytes += size
+            self._expire()
+            self._evict()
+            return True
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            value = self._data[key]
+            self._remove(key)
+            return value
+
+    def clear(self):
+        with self._lock:
+            for value in self._data.values():
+                self._dispose(value)
+            self._data.clear()
+            self._sizes.clear()
+            self._expires.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._data),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def _remove(self, key):
+        del self._data[key]
+        self._expires.pop(key, None)
+        self.current_bytes -= self._sizes.pop(key)
+
+    def _dispose(self, value):
+        if self._on_evict is not None:
+            self._on_evict(value)
+
+    def _expire(self):
+        if self.ttl is None:
+            return
+        # Thứ tự LRU không trùng thứ tự hết hạn nên phải quét hết; số mục trong cache có ttl thường nhỏ
+        now = time.monotonic()
+        for key in [key for key, expires in self._expires.items() if expires <= now]:
+            value = self._data[key]
+            self._remove(key)
+            self.evictions += 1
+            self._dispose(value)
+
+    def _evict(self):
+        while self._data and (
+            self.current_bytes > self.max_bytes
+            or (self.max_entries is not None and len(self._data) > self.max_entries)
+        ):
+            oldest = next(iter(self._data))
+            value = self._data[oldest]
+            self._remove(oldest)
+            self.evictions += 1
+            self._dispose(value)
@@ -0,0 +1,155 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+
+# Số điểm tối đa của mỗi đường trong biểu đồ chuỗi thời gian
+LINE_MAX_POINTS = 2_000
+# Số lát tối đa của biểu đồ tròn; phần còn lại gộp thành "Khác"
+PIE_MAX_SLICES = 12
+PIE_OTHER_LABEL = 'Khác'
+# Các lựa chọn số dòng mỗi trang của bảng chi tiết
+TABLE_PAGE_SIZES = [100, 500, 1_000, 5_000]
+
+
+# =========================================================
+# GIẢM MẪU CHUỖI THỜI GIAN TRƯỚC KHI GỬI LÊN TRÌNH DUYỆT
+# =========================================================
+def _as_float(values):
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.to_numpy(dtype='datetime64[ns]').astype('int64').astype('float64')
+    return values.to_numpy(dtype='float64')
+
+
+# --- LARGEST-TRIANGLE-THREE-BUCKETS: GIỮ HÌNH DẠNG ĐƯỜNG VỚI n_out ĐIỂM ---
+def lttb_indices(x, y, n_out):
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x, y = _as_float(x), _as_float(y)
+    # n_out - 2 nhóm ở giữa; điểm đầu và điểm cuối luôn được giữ
+    edges = np.linspace(1, n - 1, n_out - 1).astype('int64')
+    picked = np.empty(n_out, dtype='int64')
+    picked[0], picked[-1] = 0, n - 1
+    # Trung bình của mọi nhóm (kể cả điểm cuối) tính trước một lần; vòng lặp chỉ còn phần phụ thuộc điểm trước
+    starts = edges[1:]
+    counts = np.diff(np.append(starts, n))
+    avg_x = np.add.reduceat(x, starts) / counts
+    avg_y = np.add.reduceat(y, starts) / counts
+    prev = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Chọn điểm tạo tam giác lớn nhất với điểm đã chọn trước đó và trung bình nhóm kế tiếp
+        area = np.abs((x[prev] - avg_x[i]) * (y[lo:hi] - y[prev]) - (x[prev] - x[lo:hi]) * (avg_y[i] - y[prev]))
+        prev = lo + int(area.argmax())
+        picked[i + 1] = prev
+    return picked
+
+
+# --- MIN-MAX: GIỮ ĐỈNH VÀ ĐÁY CỦA TỪNG NHÓM (HỢP VỚI TÍN HIỆU DAO ĐỘNG) ---
+def minmax_indices(y, n_out):
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+    y = _as_float(y)
+    edges = np.linspace(0, n, (n_out - 2) // 2 + 1).astype('int64')
+    picked = [0, n - 1]
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        if hi > lo:
+            picked += [lo + int(np.argmin(y[lo:hi])), lo + int(np.argmax(y[lo:hi]))]
+    return np.unique(picked)
+
+
+def downsample_line(df, x, y, max_points=LINE_MAX_POINTS, method='lttb', by=None):
+    # Với by (ví dụ Thực tế / Dự báo) mỗi đường được giảm mẫu riêng trong ngân sách max_points
+    if len(df) <= max_points:
+        return df
+    if by is not None:
+        parts = [downsample_line(part, x, y, max_points, method) for _, part in df.groupby(by, sort=False)]
+        return pd.concat(parts)
+    if method == 'minmax':
+        positions = minmax_indices(df[y], max_points)
+    else:
+        positions = lttb_indices(df[x], df[y], max_points)
+    return df.iloc[positions]
+
+
+# --- BIỂU ĐỒ TRÒN: GỘP CÁC LÁT NHỎ ĐỂ SỐ LÁT CÓ GIỚI HẠN ---
+def top_with_other(df, names, values, max_slices=PIE_MAX_SLICES, other_label=PIE_OTHER_LABEL):
+    if len(df) <= max_slices:
+        return df
+    ordered = df.sort_values(values, ascending=False)
+    top = ordered.head(max_slices - 1)
+    other = pd.DataFrame({names: [other_label], values: [ordered[values].iloc[max_slices - 1:].sum()]})
+    return pd.concat([top[[names, values]], other], ignore_index=True)
+
+
+# --- PHÂN TRANG BẢNG CHI TIẾT ---
+def table_page(df, page, page_size):
+    n_pages = max(1, -(-len(df) // page_size))
+    page = min(max(1, int(page)), n_pages)
+    start = (page - 1) * page_size
+    return df.iloc[start:start + page_size], start, n_pages
+
+
+# =========================================================
+# ĐO DUNG LƯỢNG GỬI ĐI VÀ THỜI GIAN VẼ CỦA TỪNG BIỂU ĐỒ
+# =========================================================
+def figure_points(fig):
+    total = 0
+    for trace in fig.data:
+        for axis in ('x', 'y', 'values'):
+            values = getattr(trace, axis, None)
+            if values is not None:
+                total += len(values)
+                break
+    return total
+
+
+# Cùng một thước đo cho mọi thành phần: số byte đã tuần tự hóa gửi lên trình duyệt
+# (JSON với biểu đồ Plotly, Arrow IPC với bảng)
+def figure_payload_bytes(fig):
+    return len(fig.to_json(validate=False).encode('utf-8'))
+
+
+def table_payload_bytes(df):
+    table = pa.Table.from_pandas(df)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().size
+
+
+# enabled=False: chỉ vẽ, không đo gì (không tuần tự hóa thêm lần nào) - dùng khi tắt chế độ đo hiệu năng
+class RenderMonitor:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.records = []
+
+    def measure(self, name, render, points, payload_bytes):
+        # points, payload_bytes: hàm, chỉ được gọi khi đang đo (sau khi đã vẽ xong để không tính vào thời gian vẽ)
+        if not self.enabled:
+            render()
+            return
+        start = time.perf_counter()
+        render()
+        elapsed = time.perf_counter() - start
+        n_bytes = payload_bytes()
+        self.records.append({
+            'thanh_phan': name,
+            'so_diem': points(),
+            'dung_luong_kb': n_bytes / 1024,
+            'thoi_gian_ms': elapsed * 1000,
+        })
+
+    def figure(self, name, fig, render):
+        self.measure(name, render, lambda: figure_points(fig), lambda: figure_payload_bytes(fig))
+
+    def table(self, name, df, render):
+        self.measure(name, render, lambda: len(df), lambda: table_payload_bytes(df))
+
+    def summary(self):
+        return pd.DataFrame(self.records, columns=['thanh_phan', 'so_diem', 'dung_luong_kb', 'thoi_gian_ms'])
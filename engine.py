@@ -0,0 +1,96 @@
+import os
+from collections import namedtuple
+
+from ai_models import detect_anomalies, forecast_revenue
+from anomaly import ANOMALY_FEATURES, score_positions
+from forecasting import BATCH_TOP_PRODUCTS, FORECAST_DAYS, batch_forecast
+from ingestion import load_dataset
+from profiling import NULL_PROFILER
+
+
+ANOMALY_CONTAMINATION = 0.05
+ANOMALY_REPORT_COLUMNS = ['ngay_dat_hang', 'ma_don_hang', 'ten_san_pham', 'danh_muc', 'so_luong', 'don_gia', 'loi_nhuan']
+
+
+# =========================================================
+# BỘ MÁY PHÂN TÍCH KHÔNG PHỤ THUỘC GIAO DIỆN
+# =========================================================
+# Dùng được từ ứng dụng Streamlit, từ lịch chạy đêm hoặc từ batch_report.py:
+#   result = load_dataset(data, file_name)
+#   report = analyze(result)
+# kpis: dict các chỉ số chính của vùng chọn
+# revenue_by_date: doanh thu theo ngày (đủ mọi ngày)
+# forecast: dự báo doanh thu tổng (None nếu quá ít ngày dữ liệu)
+# batch_forecast: dự báo từng danh mục + top sản phẩm (bảng dạng dài, có khoảng dự báo)
+# anomalies: các giao dịch bất thường kèm điểm bất thường (None nếu quá ít dòng hoặc file chỉ giữ dạng tổng hợp)
+AnalysisReport = namedtuple(
+    'AnalysisReport', ['kpis', 'revenue_by_date', 'forecast', 'batch_forecast', 'anomalies']
+)
+
+
+def kpi_summary(cube_selection):
+    totals = cube_selection.totals()
+    total_revenue = int(totals['doanh_thu'])
+    total_profit = int(totals['loi_nhuan'])
+    total_orders = cube_selection.order_count()
+    return {
+        'tong_doanh_thu': total_revenue,
+        'tong_loi_nhuan': total_profit,
+        'tong_don_hang': total_orders,
+        'gia_tri_don_trung_binh': total_revenue / total_orders if total_orders > 0 else 0,
+        'ty_suat_loi_nhuan': total_profit / total_revenue * 100 if total_revenue > 0 else 0,
+    }
+
+
+def find_anomalies(df, df_selection, contamination=ANOMALY_CONTAMINATION, per_category=False, n_jobs=-1):
+    # Mô hình học trên toàn bộ dữ liệu (giống tab kiểm soát rủi ro), chỉ báo cáo các dòng trong vùng chọn
+    model_data = df_selection[ANOMALY_FEATURES].dropna()
+    if len(model_data) <= 10:
+        return None
+    scores = detect_anomalies(df, contamination=contamination, per_category=per_category, n_jobs=n_jobs)['scores']
+    scores = scores.iloc[score_positions(df, model_data)]
+    flagged = scores['anomaly'].to_numpy() == -1
+    return df_selection.loc[model_data.index[flagged], ANOMALY_REPORT_COLUMNS].assign(
+        diem_bat_thuong=scores['score'].to_numpy()[flagged]
+    )
+
+
+def analyze(ingest_result, categories=None, start_date=None, end_date=None, future_days=FORECAST_DAYS,
+            top_n=BATCH_TOP_PRODUCTS, contamination=ANOMALY_CONTAMINATION, n_jobs=-1, profiler=NULL_PROFILER):
+    df, cube = ingest_result.df, ingest_result.cube
+    # Danh mục / khoảng ngày mặc định lấy từ khối tổng hợp: có cả khi file chỉ được giữ ở dạng tổng hợp (df=None)
+    if categories is None:
+        categories = list(cube.categories)
+    if start_date is None:
+        start_date = cube.days.min()
+    if end_date is None:
+        end_date = cube.days.max()
+
+    with profiler.stage('filtering', rows=ingest_result.raw_rows):
+        df_selection = ingest_result.filter_index.select(categories, start_date, end_date) if df is not None else None
+        cube_selection = cube.select(categories, start_date, end_date)
+    with profiler.stage('kpi'):
+        kpis = kpi_summary(cube_selection)
+        revenue_by_date = cube_selection.revenue_by_date()
+    forecast = None
+    with profiler.stage('forecast'):
+        if len(revenue_by_date) > 3:
+            forecast = forecast_revenue(revenue_by_date, future_days=future_days)['forecast']
+        batch = batch_forecast(cube_selection, top_n=top_n, future_days=future_days)
+    anomalies = None
+    if df is not None:
+        with profiler.stage('anomalies', rows=len(df_selection)):
+            anomalies = find_anomalies(df, df_selection, contamination=contamination, n_jobs=n_jobs)
+    return AnalysisReport(kpis, revenue_by_date, forecast, batch, anomalies)
+
+
+def analyze_file(path, profiler=NULL_PROFILER, **options):
+    with open(path, 'rb') as f:
+        data = f.read()
+    with profiler.stage('ingestion'):
+        result = load_dataset(data, os.path.basename(path), profiler=profiler)
+    if result.missing_columns is not None:
+        raise ValueError(f"Thiếu cột: {', '.join(sorted(result.missing_columns))}")
+    if result.cube is None:
+        raise ValueError('Không có dòng dữ liệu hợp lệ sau khi xử lý ngày tháng')
+    return analyze(result, profiler=profiler, **options)
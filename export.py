@@ -0,0 +1,182 @@
+import gzip
+import io
+import tempfile
+import threading
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+
+
+# Số dòng được chuyển đổi và ghi ra mỗi lần
+EXPORT_CHUNK_ROWS = 100_000
+# File xuất nhỏ hơn ngưỡng này nằm trong RAM, lớn hơn thì tự chuyển xuống file tạm trên ổ đĩa
+EXPORT_SPOOL_BYTES = 32 * 1024 * 1024
+# Giới hạn số dòng của một sheet Excel (trừ dòng tiêu đề); vượt quá thì sang sheet mới
+XLSX_MAX_ROWS = 1_048_575
+# Định dạng: (nhãn hiển thị, đuôi file, MIME)
+EXPORT_FORMATS = {
+    'csv': ('CSV', 'csv', 'text/csv'),
+    'csv.gz': ('CSV nén (gzip)', 'csv.gz', 'application/gzip'),
+    'parquet': ('Parquet', 'parquet', 'application/vnd.apache.parquet'),
+    'xlsx': ('Excel (xlsx)', 'xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+
+def _chunks(df, chunk_rows):
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+# =========================================================
+# GHI DỮ LIỆU THEO TỪNG KHÚC: BỘ NHỚ ĐỈNH CHỈ PHỤ THUỘC KÍCH THƯỚC KHÚC
+# =========================================================
+def write_csv(df, fileobj, compress=False, chunk_rows=EXPORT_CHUNK_ROWS):
+    # Mức nén 6 nhanh hơn nhiều so với mặc định 9 mà file chỉ lớn hơn chút ít
+    target = gzip.GzipFile(fileobj=fileobj, mode='wb', compresslevel=6) if compress else fileobj
+    # utf-8-sig (có BOM) để Excel mở đúng tiếng Việt, giống nút tải cũ; BOM chỉ ghi một lần ở đầu file
+    target.write(df.head(0).to_csv(index=False).encode('utf-8-sig'))
+    for chunk in _chunks(df, chunk_rows):
+        target.write(chunk.to_csv(header=False, index=False).encode('utf-8'))
+    if compress:
+        # Chỉ ghi phần đuôi gzip, không đóng file đích
+        target.close()
+
+
+def parquet_schema(df):
+    # Lược đồ lấy từ kiểu dữ liệu của cả bảng, không phải khúc đầu: cột object rỗng ở khúc đầu
+    # (kiểu null) mà khúc sau có chuỗi sẽ làm ParquetWriter báo lỗi lệch lược đồ
+    schema = pa.Schema.from_pandas(df.head(0), preserve_index=False)
+    for i, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            values = df[field.name].dropna()
+            value_type = pa.infer_type(values.to_numpy(), from_pandas=True) if len(values) else pa.string()
+            schema = schema.set(i, field.with_type(value_type))
+    return schema
+
+
+def write_parquet(df, fileobj, chunk_rows=EXPORT_CHUNK_ROWS):
+    schema = parquet_schema(df)
+    # Mỗi khúc là một row group
+    with pq.ParquetWriter(fileobj, schema) as writer:
+        for chunk in _chunks(df, chunk_rows):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def write_xlsx(df, fileobj, chunk_rows=EXPORT_CHUNK_ROWS):
+    # Chế độ write-only ghi từng dòng ra file tạm thay vì giữ cả bảng tính trong bộ nhớ
+    workbook = Workbook(write_only=True)
+    header = [str(col) for col in df.columns]
+    sheet, sheet_rows = None, XLSX_MAX_ROWS
+    for chunk in _chunks(df, chunk_rows):
+        # openpyxl không hiểu NaN/NaT: thay bằng ô trống
+        values = chunk.astype(object).where(chunk.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            if sheet_rows >= XLSX_MAX_ROWS:
+                sheet = workbook.create_sheet(f'du_lieu_{len(workbook.worksheets) + 1}')
+                sheet.append(header)
+                sheet_rows = 0
+            sheet.append(row)
+            sheet_rows += 1
+    if sheet is None:
+        workbook.create_sheet('du_lieu_1').append(header)
+    workbook.save(fileobj)
+
+
+# --- BỘ ĐỆM GHI: TRONG RAM KHI NHỎ, CHUYỂN XUỐNG FILE TẠM KHI VƯỢT max_size ---
+# Tự quản lý việc chuyển (không dùng SpooledTemporaryFile) để lấy được bộ đệm BytesIO qua API công khai
+class _Spool(io.BufferedIOBase):
+    mode = 'w+b'
+
+    def __init__(self, max_size):
+        super().__init__()
+        self.max_size = max_size
+        self.file = io.BytesIO()
+        self.on_disk = False
+
+    def write(self, data):
+        n = self.file.write(data)
+        if not self.on_disk and self.file.tell() > self.max_size:
+            self._rollover()
+        return n
+
+    def _rollover(self):
+        disk = tempfile.TemporaryFile()
+        with self.file.getbuffer() as buffer:
+            disk.write(buffer)
+        disk.seek(self.file.tell())
+        self.file = disk
+        self.on_disk = True
+
+    def seek(self, pos, whence=io.SEEK_SET):
+        return self.file.seek(pos, whence)
+
+    def tell(self):
+        return self.file.tell()
+
+    def read(self, size=-1):
+        return self.file.read(size)
+
+    def flush(self):
+        self.file.flush()
+
+    def readable(self):
+        return True
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+
+# --- FILE ĐÃ XUẤT, ĐỌC LẠI ĐƯỢC NHIỀU LẦN ---
+# Nút tải của Streamlit chỉ nhận bytes nên mỗi lượt tải đều cần nội dung trong RAM:
+# file nhỏ giữ sẵn một đối tượng bytes (bất biến, mọi lượt tải dùng chung, không chép lại);
+# file lớn nằm ở file tạm trên ổ đĩa và chỉ được đọc ra khi có lượt tải.
+class ExportFile:
+    def __init__(self, fmt, size, data=None, spool=None):
+        self.fmt = fmt
+        self.size = size
+        self._data = data
+        self._file = spool
+        self._lock = threading.Lock()
+
+    def __sizeof__(self):
+        return self.size
+
+    def read(self):
+        # None nếu file đã bị đóng (bị đẩy khỏi bộ nhớ đệm trong lúc đang tải): người gọi tạo lại
+        if self._data is not None:
+            return self._data
+        # Nhiều lượt tải có thể đọc cùng lúc nên vị trí con trỏ phải được khóa
+        with self._lock:
+            if self._file is None:
+                return self._data
+            self._file.seek(0)
+            return self._file.read()
+
+    def close(self):
+        with self._lock:
+            self._data = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def export_frame(df, fmt, chunk_rows=EXPORT_CHUNK_ROWS, spool_bytes=EXPORT_SPOOL_BYTES):
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f'Định dạng xuất không hỗ trợ: {fmt}')
+    spool = _Spool(spool_bytes)
+    if fmt == 'parquet':
+        write_parquet(df, spool, chunk_rows)
+    elif fmt == 'xlsx':
+        write_xlsx(df, spool, chunk_rows)
+    else:
+        write_csv(df, spool, compress=(fmt == 'csv.gz'), chunk_rows=chunk_rows)
+    size = spool.seek(0, io.SEEK_END)
+    if spool.on_disk:
+        return ExportFile(fmt, size, spool=spool.file)
+    # Còn trong BytesIO: getvalue() lấy luôn bộ đệm, không chép thêm một bản
+    # (read() thì chép, làm đỉnh RAM gấp đôi kích thước file)
+    return ExportFile(fmt, size, data=spool.file.getvalue())
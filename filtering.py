@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+
+# =========================================================
+# CHỈ MỤC LỌC: NGÀY ĐÃ SẮP XẾP + MÃ DANH MỤC
+# =========================================================
+def sort_by_date(df):
+    if df['ngay_dat_hang'].is_monotonic_increasing:
+        return df
+    # Sắp xếp ổn định để các dòng cùng ngày giữ nguyên thứ tự trong file
+    return df.sort_values('ngay_dat_hang', kind='stable')
+
+
+class FilterIndex:
+    # df phải được sắp xếp tăng dần theo ngay_dat_hang (xem sort_by_date)
+    def __init__(self, df):
+        self.df = df
+        self.dates = df['ngay_dat_hang'].to_numpy()
+        codes, categories = pd.factorize(df['danh_muc'])
+        self.categories = pd.Index(np.asarray(categories))
+        self.cat_codes = codes.astype('int32', copy=False)
+
+    def date_bounds(self, start_date, end_date):
+        # Tìm kiếm nhị phân: khoảng ngày là một đoạn liên tục [lo, hi) của bảng đã sắp xếp
+        start = np.datetime64(pd.Timestamp(start_date).floor('D'))
+        end = np.datetime64(pd.Timestamp(end_date).floor('D') + pd.Timedelta(days=1))
+        start = start.astype(self.dates.dtype)
+        end = end.astype(self.dates.dtype)
+        return self.dates.searchsorted(start, 'left'), self.dates.searchsorted(end, 'left')
+
+    def category_mask(self, categories, lo, hi):
+        selected = self.categories.get_indexer(pd.Index(list(categories)))
+        selected = selected[selected >= 0]
+        if len(selected) == len(self.categories) and not (self.cat_codes[lo:hi] < 0).any():
+            return None
+        # Bảng tra cứu theo mã danh mục; phần tử cuối (mã -1 = trống) luôn là False
+        lookup = np.zeros(len(self.categories) + 1, dtype=bool)
+        lookup[selected] = True
+        return lookup[self.cat_codes[lo:hi]]
+
+    def select(self, categories, start_date, end_date):
+        lo, hi = self.date_bounds(start_date, end_date)
+        # Cắt theo vị trí: pandas trả về view, không sao chép dữ liệu
+        window = self.df.iloc[lo:hi]
+        mask = self.category_mask(categories, lo, hi)
+        if mask is None or mask.all():
+            return window
+        return window.iloc[np.flatnonzero(mask)]
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+
+
+FORECAST_DAYS = 30
+# Số sản phẩm có doanh thu cao nhất được dự báo riêng
+BATCH_TOP_PRODUCTS = 20
+# Mỗi chuỗi cần nhiều hơn chừng này ngày lịch sử mới được dự báo (giống tab dự báo tổng)
+MIN_HISTORY_DAYS = 3
+
+
+# =========================================================
+# DỰ BÁO HÀNG LOẠT: MỘT PHÉP GIẢI BÌNH PHƯƠNG TỐI THIỂU CHO MỌI CHUỖI
+# =========================================================
+# Cùng mô hình với tab dự báo tổng: doanh_thu ~ 1 + ngay_so + thu_trong_tuan.
+# Mọi chuỗi dùng chung lưới ngày nên ma trận thiết kế X (T x P) là chung; mỗi chuỗi chỉ khác
+# trọng số W (1 từ ngày bán đầu tiên của chuỗi trở đi), nên có thể giải cả lô bằng einsum.
+def design_matrix(dates, origin):
+    dates = pd.DatetimeIndex(dates)
+    return np.column_stack([
+        np.ones(len(dates)),
+        (dates - origin).days.to_numpy(dtype='float64'),
+        dates.dayofweek.to_numpy(dtype='float64'),
+    ])
+
+
+def fit_batch(Y, W, X):
+    # Y, W: (S, T) giá trị và trọng số của S chuỗi; X: (T, P) ma trận thiết kế chung
+    XtX = np.einsum('st,ti,tj->sij', W, X, X, optimize=True)
+    XtY = np.einsum('st,ti->si', W * Y, X, optimize=True)
+    # pinv thay cho inv để chuỗi suy biến (ví dụ chỉ bán vào một thứ trong tuần) không làm hỏng cả lô
+    XtX_inv = np.linalg.pinv(XtX)
+    coef = np.einsum('sij,sj->si', XtX_inv, XtY)
+    resid = (Y - coef @ X.T) * W
+    dof = np.maximum(W.sum(axis=1) - X.shape[1], 1)
+    sigma2 = (resid ** 2).sum(axis=1) / dof
+    return coef, XtX_inv, sigma2, dof
+
+
+def predict_batch(coef, XtX_inv, sigma2, dof, X_future, level=0.95):
+    from scipy import stats
+
+    mean = coef @ X_future.T
+    # Khoảng dự báo: sai số phần dư + độ bất định của hệ số tại từng điểm tương lai
+    leverage = np.einsum('fi,sij,fj->sf', X_future, XtX_inv, X_future, optimize=True)
+    se = np.sqrt(sigma2[:, None] * (1 + leverage))
+    t_value = stats.t.ppf((1 + level) / 2, dof)[:, None]
+    return mean, mean - t_value * se, mean + t_value * se
+
+
+def _series_matrix(cells, key, day_offsets, n_days):
+    # Một lần groupby (chuỗi, ngày) rồi rải thẳng vào ma trận S x T
+    by_series_day = cells.groupby([key, 'day'])['doanh_thu'].sum()
+    series_codes = by_series_day.index.get_level_values(0).to_numpy()
+    uniques, rows = np.unique(series_codes, return_inverse=True)
+    Y = np.zeros((len(uniques), n_days))
+    cols = day_offsets[by_series_day.index.get_level_values(1).to_numpy()]
+    Y[rows, cols] = by_series_day.to_numpy()
+    first_col = np.full(len(uniques), n_days)
+    np.minimum.at(first_col, rows, cols)
+    return uniques, Y, first_col
+
+
+def batch_forecast(cube_selection, top_n=BATCH_TOP_PRODUCTS, future_days=FORECAST_DAYS, level=0.95):
+    cube = cube_selection.cube
+    cells = cube_selection.cells
+    columns = ['cap_do', 'ten', 'ngay_dat_hang', 'du_bao', 'can_duoi', 'can_tren']
+    if cells.empty:
+        return pd.DataFrame(columns=columns)
+
+    used_days = cube.days[np.unique(cells['day'].to_numpy())]
+    grid = pd.date_range(used_days.min(), used_days.max(), freq='D')
+    day_offsets = np.full(len(cube.days), -1)
+    day_offsets[cube.days.get_indexer(used_days)] = (used_days - grid[0]).days
+    X = design_matrix(grid, grid[0])
+    future_dates = pd.date_range(grid[-1] + pd.Timedelta(days=1), periods=future_days, freq='D')
+    X_future = design_matrix(future_dates, grid[0])
+
+    top_products = (
+        cells[cells['prod'] >= 0].groupby('prod')['doanh_thu'].sum().nlargest(top_n).index
+    )
+    levels = [
+        ('danh_muc', cells, 'cat', cube.categories),
+        ('san_pham', cells[cells['prod'].isin(top_products)], 'prod', cube.products),
+    ]
+    labels, matrices, first_cols = [], [], []
+    for level_name, level_cells, key, names in levels:
+        if level_cells.empty:
+            continue
+        codes, Y, first_col = _series_matrix(level_cells, key, day_offsets, len(grid))
+        labels += [(level_name, names[code]) for code in codes]
+        matrices.append(Y)
+        first_cols.append(first_col)
+    Y = np.vstack(matrices)
+    first_col = np.concatenate(first_cols)
+    W = (np.arange(len(grid))[None, :] >= first_col[:, None]).astype('float64')
+
+    enough = W.sum(axis=1) > MIN_HISTORY_DAYS
+    if not enough.any():
+        return pd.DataFrame(columns=columns)
+    mean, lower, upper = predict_batch(*fit_batch(Y[enough], W[enough], X), X_future, level=level)
+    kept = [label for label, ok in zip(labels, enough) if ok]
+    return pd.DataFrame({
+        'cap_do': np.repeat([label[0] for label in kept], future_days),
+        'ten': np.repeat([label[1] for label in kept], future_days),
+        'ngay_dat_hang': np.tile(future_dates.to_numpy(), len(kept)),
+        'du_bao': mean.ravel(),
+        'can_duoi': lower.ravel(),
+        'can_tren': upper.ravel(),
+    }, columns=columns)
+
+
+def forecast_summary(forecast):
+    # Tổng dự báo cả giai đoạn cho từng chuỗi (khoảng dự báo chỉ có ý nghĩa theo từng ngày)
+    return forecast.groupby(['cap_do', 'ten'], sort=False)['du_bao'].sum().reset_index()
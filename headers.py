@@ -0,0 +1,160 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+
+# =========================================================
+# NHẬN DIỆN TÊN CỘT: CHUẨN HÓA MỘT LƯỢT + SO KHỚP GẦN ĐÚNG CÓ CHẤM ĐIỂM
+# =========================================================
+CANONICAL_COLUMNS = [
+    'ngay_dat_hang', 'ma_don_hang', 'ten_san_pham',
+    'danh_muc', 'so_luong', 'don_gia', 'chi_phi'
+]
+
+# Các cách viết đã biết của từng cột chuẩn; được chuẩn hóa bằng simple_normalize trước khi so khớp,
+# nên viết hoa / có dấu / camelCase đều được (ví dụ 'dGia' -> 'd_gia' vẫn khớp 'dgia' sau khi bỏ '_').
+# Không dùng tên chung chung một từ ('ngay', 'gia', 'product'): 'Ngày giao', 'Giá vốn' cũng chứa chúng.
+COLUMN_ALIASES = {
+    'ngay_dat_hang': ['ngay_dat_hang', 'ngay_dat', 'order_date', 'ngay_hang', 'ngay_ban', 'ngay_mua',
+                      'ngay_giao_dich', 'ngay_chung_tu', 'ngay_hoa_don'],
+    'ma_don_hang': ['ma_don_hang', 'ma_don', 'order_id', 'ma_dh', 'so_don_hang', 'ma_hoa_don', 'so_hoa_don',
+                    'so_chung_tu', 'invoice_id', 'order_no'],
+    'ten_san_pham': ['ten_san_pham', 'ten_sp', 'product_name', 'san_pham', 'ten_hang', 'ten_hang_hoa',
+                     'mat_hang'],
+    'danh_muc': ['danh_muc', 'category', 'phan_loai', 'nhom_hang', 'loai_hang', 'nganh_hang', 'loai_san_pham',
+                 'nhom_san_pham'],
+    'so_luong': ['so_luong', 'soluong', 'quantity', 'sl', 'qty', 'so_luong_ban'],
+    'don_gia': ['don_gia', 'dongia', 'dGia', 'gia_ban', 'price', 'unit_price', 'gia_ban_le'],
+    'chi_phi': ['chi_phi', 'chiphi', 'gia_von', 'cost', 'gia_goc', 'gia_nhap', 'unit_cost', 'chi_phi_don_vi'],
+}
+
+# Điểm tối thiểu để một tên cột được coi là khớp gần đúng với một cột chuẩn
+FUZZY_MIN_SCORE = 0.8
+# Số dòng đầu của mỗi sheet được xét để tìm dòng tiêu đề (bỏ qua tiêu đề báo cáo, dòng trống phía trên)
+HEADER_SCAN_ROWS = 20
+
+# đ/Đ không tách được dấu bằng NFD nên đổi trước bằng bảng dịch
+_TRANSLATE = str.maketrans({'đ': 'd', 'Đ': 'D'})
+_CAMEL_BOUNDARY = re.compile(r'(?<=[a-z0-9])(?=[A-Z])')
+_SEPARATORS = re.compile(r'[^a-z0-9]+')
+# Phần trong ngoặc thường là đơn vị / định dạng: 'Đơn giá (VNĐ)', 'Ngày đặt hàng (dd/mm/yyyy)'
+_BRACKETED = re.compile(r'\(.*?\)|\[.*?\]')
+# Khớp sau khi bỏ phần trong ngoặc xếp ngay sau khớp chính xác
+BRACKET_STRIPPED_WEIGHT = 0.99
+
+
+# --- 1. HÀM CHUẨN HÓA TÊN CỘT (MỘT LƯỢT, CÓ GHI NHỚ) ---
+@lru_cache(maxsize=8192)
+def simple_normalize(col_name):
+    if col_name is None:
+        return None
+    # NFD tách chữ và dấu; bỏ ký tự không phải ASCII là bỏ toàn bộ dấu tiếng Việt trong một lượt
+    text = unicodedata.normalize('NFD', str(col_name).translate(_TRANSLATE))
+    text = text.encode('ascii', 'ignore').decode('ascii')
+    text = _CAMEL_BOUNDARY.sub('_', text).lower()
+    return _SEPARATORS.sub('_', text).strip('_')
+
+
+def _compact(key):
+    return key.replace('_', '')
+
+
+# Bảng tra: tên đã chuẩn hóa (và dạng bỏ '_') -> cột chuẩn
+ALIAS_LOOKUP = {}
+for _canonical, _aliases in COLUMN_ALIASES.items():
+    for _alias in _aliases:
+        ALIAS_LOOKUP.setdefault(simple_normalize(_alias), _canonical)
+        ALIAS_LOOKUP.setdefault(_compact(simple_normalize(_alias)), _canonical)
+
+
+def _edit_distance(a, b, limit):
+    # Levenshtein với hai hàng; dừng sớm (trả None) khi mọi ô đã vượt limit
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return None
+        previous = current
+    return previous[-1]
+
+
+def _similarity(key, alias):
+    # Điểm theo từ (Jaccard), chỉ tính khi MỌI từ của tên cột đều có trong alias: từ thừa thường đổi nghĩa
+    # ('ngay_giao_hang', 'chi_phi_van_chuyen', 'so_luong_ton' không phải ngày đặt, chi phí, số lượng bán)
+    key_tokens, alias_tokens = set(key.split('_')), set(alias.split('_'))
+    token_score = 0.0
+    if key_tokens <= alias_tokens:
+        token_score = 0.95 * len(key_tokens) / len(alias_tokens)
+    # Điểm theo khoảng cách sửa trên dạng bỏ '_' (bắt lỗi chính tả, viết liền)
+    a, b = _compact(key), _compact(alias)
+    longest = max(len(a), len(b))
+    limit = int(longest * (1 - FUZZY_MIN_SCORE))
+    edit_score = 0.0
+    if longest and abs(len(a) - len(b)) <= limit:
+        distance = _edit_distance(a, b, limit)
+        if distance is not None and distance <= limit:
+            edit_score = 1 - distance / longest
+    return max(token_score, edit_score)
+
+
+# --- 2. ĐIỂM KHỚP CỦA MỘT TÊN CỘT VỚI TỪNG CỘT CHUẨN (CÓ GHI NHỚ) ---
+@lru_cache(maxsize=8192)
+def header_scores(key):
+    if not key:
+        return ()
+    exact = ALIAS_LOOKUP.get(key) or ALIAS_LOOKUP.get(_compact(key))
+    if exact is not None:
+        return ((exact, 1.0),)
+    scores = []
+    for canonical, aliases in COLUMN_ALIASES.items():
+        best = max(_similarity(key, simple_normalize(alias)) for alias in aliases)
+        if best >= FUZZY_MIN_SCORE:
+            scores.append((canonical, best))
+    return tuple(sorted(scores, key=lambda item: -item[1]))
+
+
+# --- 3. GÁN TÊN CHUẨN CHO CẢ DÒNG TIÊU ĐỀ ---
+@lru_cache(maxsize=8192)
+def column_scores(col_name):
+    scores = dict(header_scores(simple_normalize(col_name)))
+    if isinstance(col_name, str) and _BRACKETED.search(col_name):
+        for canonical, score in header_scores(simple_normalize(_BRACKETED.sub(' ', col_name))):
+            scores[canonical] = max(scores.get(canonical, 0.0), score * BRACKET_STRIPPED_WEIGHT)
+    return tuple(scores.items())
+
+
+def resolve_headers(original_cols, matches=None):
+    # matches: nếu là list thì được thêm (tên gốc, cột chuẩn, điểm) của các cột khớp gần đúng
+    # (không tính khớp chính xác sau khi bỏ phần trong ngoặc) để giao diện hiển thị cho người dùng kiểm tra
+    keys = [simple_normalize(col) for col in original_cols]
+    # Mỗi cột chuẩn chỉ gán cho một cột: điểm cao nhất thắng, bằng điểm thì cột đứng trước thắng
+    candidates = sorted(
+        (-score, position, canonical)
+        for position, col in enumerate(original_cols)
+        for canonical, score in column_scores(col)
+    )
+    assigned, taken = {}, set()
+    for negative_score, position, canonical in candidates:
+        if position not in assigned and canonical not in taken:
+            assigned[position] = canonical
+            taken.add(canonical)
+            if matches is not None and -negative_score < BRACKET_STRIPPED_WEIGHT:
+                matches.append((str(original_cols[position]), canonical, -negative_score))
+    resolved = []
+    for position, key in enumerate(keys):
+        name = assigned.get(position, key)
+        # Cột không được gán nhưng trùng tên chuẩn (ví dụ hai cột "Số lượng") thì đổi tên để không bị trùng
+        if position not in assigned and name in taken:
+            name = f'{name}_{position}'
+        resolved.append(name)
+    return resolved
+
+
+def header_match_count(row):
+    # Số cột chuẩn nhận ra được trong một dòng: dùng để tìm dòng tiêu đề trong sheet Excel
+    values = [value for value in row if isinstance(value, str) and value.strip()]
+    if not values:
+        return 0
+    return len(set(resolve_headers(values)) & set(CANONICAL_COLUMNS))
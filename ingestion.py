@@ -0,0 +1,385 @@
+import hashlib
+import io
+import re
+from collections import namedtuple
+from itertools import chain
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+from pandas.tseries.api import guess_datetime_format
+
+from aggregation import CUBE_MEASURES, SalesCube, build_aggregates
+from filtering import FilterIndex, sort_by_date
+from headers import CANONICAL_COLUMNS, HEADER_SCAN_ROWS, header_match_count, resolve_headers
+from profiling import NULL_PROFILER
+from storage import read_columnar, write_columnar
+
+
+# --- HÀM ĐỔI TÊN VÀ KIỂM TRA (CHUẨN HÓA + SO KHỚP GẦN ĐÚNG Ở headers.py) ---
+def normalize_column_names(original_cols, matches=None):
+    return resolve_headers(list(original_cols), matches)
+
+def rename_and_validate(df, matches=None):
+    df.columns = normalize_column_names(df.columns, matches)
+    uploaded_columns = set(df.columns)
+    required_columns = set(CANONICAL_COLUMNS)
+    if required_columns.issubset(uploaded_columns):
+        return True, None
+    else:
+        missing_columns = list(required_columns - uploaded_columns)
+        return False, missing_columns
+
+# --- HÀM TÍNH TOÁN ---
+def calculate_metrics(df):
+    df['so_luong'] = pd.to_numeric(df['so_luong'], errors='coerce').fillna(0)
+    df['don_gia'] = pd.to_numeric(df['don_gia'], errors='coerce').fillna(0)
+    df['chi_phi'] = pd.to_numeric(df['chi_phi'], errors='coerce').fillna(0)
+    # Cùng cách đọc ngày với đường CSV streaming (xem parse_dates) để hai đường cho cùng kết quả
+    df['ngay_dat_hang'] = parse_dates(df['ngay_dat_hang'], _guess_date_format(df['ngay_dat_hang']))
+    df = df.dropna(subset=['ngay_dat_hang'])
+    if not df.empty:
+        df['doanh_thu'] = df['so_luong'] * df['don_gia']
+        df['loi_nhuan'] = df['doanh_thu'] - (df['so_luong'] * df['chi_phi'])
+    return df
+
+
+# =========================================================
+# NẠP DỮ LIỆU CÓ BỘ NHỚ ĐỆM THEO MÃ BĂM NỘI DUNG FILE
+# =========================================================
+# df: dữ liệu đã làm sạch (None nếu file thiếu cột)
+# missing_columns: danh sách cột bị thiếu (None nếu hợp lệ)
+# raw_rows: số dòng đọc được từ file trước khi xử lý ngày tháng
+# cube: khối tổng hợp ngày x danh mục x sản phẩm dùng cho KPI và biểu đồ
+# filter_index: chỉ mục lọc theo ngày/danh mục trên df (df đã được sắp xếp theo ngày)
+#   File CSV rất lớn chỉ giữ khối tổng hợp: df=None, filter_index=None, chỉ có cube
+# fingerprint: mã băm nội dung file (hoặc phiên bản kho dữ liệu) dùng làm khóa cho các bộ nhớ đệm khác
+# header_matches: các cột được nhận diện gần đúng [(tên gốc, cột chuẩn, điểm)] để người dùng kiểm tra
+IngestResult = namedtuple(
+    'IngestResult', ['df', 'missing_columns', 'raw_rows', 'cube', 'filter_index', 'fingerprint', 'header_matches'],
+    defaults=(None, None, None, None)
+)
+
+
+def file_fingerprint(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+# Số dòng Excel gom lại trước khi chuyển thành DataFrame khi đọc kiểu streaming
+EXCEL_CHUNK_ROWS = 50_000
+
+
+def _dedupe_headers(header):
+    # Đặt tên cột giống pandas: ô trống -> 'Unnamed: i', tên trùng -> 'ten.1', 'ten.2'...
+    columns, seen = [], {}
+    for i, name in enumerate(header):
+        if name is None or (isinstance(name, str) and not name.strip()):
+            name = f'Unnamed: {i}'
+        if name in seen:
+            seen[name] += 1
+            name = f'{name}.{seen[name]}'
+        else:
+            seen[name] = 0
+        columns.append(name)
+    return columns
+
+
+def _find_header(rows):
+    # Dòng tiêu đề = dòng nhận ra nhiều cột chuẩn nhất trong HEADER_SCAN_ROWS dòng đầu
+    # (file xuất từ phần mềm kế toán thường có tên báo cáo, kỳ báo cáo, dòng trống phía trên)
+    head, best, best_score = [], None, 0
+    for row in rows:
+        head.append(row)
+        score = header_match_count(row)
+        if score > best_score:
+            best, best_score = len(head) - 1, score
+        if best_score == len(CANONICAL_COLUMNS) or len(head) >= HEADER_SCAN_ROWS:
+            break
+    if best is None:
+        # Không nhận ra cột nào: giữ cách cũ, lấy dòng không trống đầu tiên làm tiêu đề
+        best = next((i for i, row in enumerate(head) if any(value is not None for value in row)), None)
+        if best is None:
+            return None, 0, rows
+    return head[best], best_score, chain(head[best + 1:], rows)
+
+
+def _read_sheet(header, rows, chunk_rows, matches=None):
+    # Tên cột được chuẩn hóa ngay tại đây để các sheet ghép được với nhau dù đặt tên khác nhau
+    columns = resolve_headers(_dedupe_headers(header), matches)
+    width = len(columns)
+    chunks, batch = [], []
+    for row in rows:
+        if all(value is None for value in row):
+            continue
+        if len(row) != width:
+            row = (tuple(row) + (None,) * width)[:width]
+        batch.append(row)
+        if len(batch) >= chunk_rows:
+            chunks.append(pd.DataFrame.from_records(batch, columns=columns))
+            batch = []
+    if batch or not chunks:
+        chunks.append(pd.DataFrame.from_records(batch, columns=columns))
+    return chunks
+
+
+def read_excel_streaming(buffer, chunk_rows=EXCEL_CHUNK_ROWS):
+    from openpyxl import load_workbook
+
+    # read_only: openpyxl đọc lần lượt từng dòng thay vì dựng toàn bộ các đối tượng ô trong RAM
+    wb = load_workbook(buffer, read_only=True, data_only=True)
+    try:
+        # Mọi sheet có đủ cột chuẩn đều được đọc và ghép lại (dữ liệu chia theo tháng / chi nhánh);
+        # không sheet nào đủ thì đọc sheet nhận ra nhiều cột nhất để báo đúng các cột còn thiếu
+        chunks, fallback, matches = [], None, []
+        for ws in wb.worksheets:
+            header, score, rows = _find_header(ws.iter_rows(values_only=True))
+            if header is None:
+                continue
+            if score == len(CANONICAL_COLUMNS):
+                chunks += _read_sheet(header, rows, chunk_rows, matches)
+            elif fallback is None or score > fallback[0]:
+                fallback = (score, ws.title)
+        if not chunks and fallback is not None:
+            header, _, rows = _find_header(wb[fallback[1]].iter_rows(values_only=True))
+            chunks = _read_sheet(header, rows, chunk_rows, matches)
+    finally:
+        wb.close()
+    if not chunks:
+        return pd.DataFrame()
+    df = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+    # Tên cột đã được đổi ở đây nên các cột khớp gần đúng được chuyển tiếp cho process_raw qua attrs
+    df.attrs['header_matches'] = unique_matches(matches)
+    return df
+
+
+# =========================================================
+# ĐỌC CSV THEO TỪNG KHỐI VỚI KIỂU DỮ LIỆU CỐ ĐỊNH
+# =========================================================
+# Số dòng mỗi khối: giới hạn bộ nhớ tạm của trình đọc (chuỗi thô)
+CSV_CHUNK_ROWS = 200_000
+# File CSV từ kích thước này trở lên sẽ được đọc kiểu streaming (các dòng đã làm sạch vẫn được giữ lại hết)
+CSV_STREAMING_MIN_BYTES = 32 * 1024 * 1024
+# File CSV từ kích thước này trở lên chỉ giữ khối tổng hợp, không giữ từng dòng: bộ nhớ khi đọc chỉ còn
+# một khối dòng + các ô ngày x danh mục x sản phẩm, không tăng theo số dòng của file
+CSV_AGGREGATE_ONLY_BYTES = 512 * 1024 * 1024
+
+TEXT_COLUMNS = ['ma_don_hang', 'ten_san_pham', 'danh_muc']
+NUMERIC_COLUMNS = ['so_luong', 'don_gia', 'chi_phi']
+
+
+def unique_matches(matches):
+    # Nhiều sheet cùng tiêu đề cho ra cùng một cặp khớp: chỉ giữ một lần, theo thứ tự gặp
+    return list(dict.fromkeys(tuple(match) for match in matches))
+
+
+def csv_schema(header, matches=None):
+    # Ánh xạ tên cột gốc -> tên chuẩn, chỉ giữ cột chuẩn đầu tiên tìm thấy
+    rename = {}
+    for col, new_col in zip(header, normalize_column_names(header, matches)):
+        if new_col in CANONICAL_COLUMNS and new_col not in rename.values():
+            rename[col] = new_col
+    dtype = {}
+    for col, new_col in rename.items():
+        if new_col in TEXT_COLUMNS:
+            dtype[col] = 'category'
+        elif new_col == 'ngay_dat_hang':
+            dtype[col] = 'str'
+    # Cột số để trình đọc C tự nhận kiểu, sau đó mới ép kiểu có coerce như calculate_metrics
+    return rename, dtype
+
+
+# Định dạng ngày được đoán một lần từ giá trị đầu tiên rồi áp cho cả file (mọi khối, cả đường đọc thường):
+# đoán lại theo từng dòng vừa chậm vừa có thể đọc cùng một cột theo hai kiểu khác nhau
+def _guess_date_format(dates):
+    sample = dates.dropna()
+    if sample.empty or not isinstance(sample.iloc[0], str):
+        return None
+    first = sample.iloc[0].strip()
+    # Ngày bắt đầu bằng năm (2024-01-02) luôn là năm-tháng-ngày; dayfirst chỉ đúng với ngày/tháng/năm
+    return guess_datetime_format(first, dayfirst=not re.match(r'\d{4}\D', first))
+
+
+def parse_dates(dates, date_format):
+    # Giá trị không khớp định dạng thành NaT và bị loại như trước; không đoán được định dạng thì để pandas tự đọc
+    if date_format is not None:
+        return pd.to_datetime(dates, format=date_format, errors='coerce')
+    return pd.to_datetime(dates, dayfirst=True, errors='coerce')
+
+
+def _clean_chunk(chunk, date_format):
+    # Giữ float64 như calculate_metrics: float32 làm lệch tổng doanh thu so với đường đọc thường
+    for col in NUMERIC_COLUMNS:
+        chunk[col] = pd.to_numeric(chunk[col], errors='coerce').fillna(0).astype('float64')
+    chunk['ngay_dat_hang'] = parse_dates(chunk['ngay_dat_hang'], date_format)
+    chunk = chunk[chunk['ngay_dat_hang'].notna()]
+    chunk = chunk.assign(doanh_thu=chunk['so_luong'] * chunk['don_gia'])
+    chunk = chunk.assign(loi_nhuan=chunk['doanh_thu'] - chunk['so_luong'] * chunk['chi_phi'])
+    return chunk
+
+
+def _concat_chunks(chunks):
+    if len(chunks) == 1:
+        return chunks[0].reset_index(drop=True)
+    data = {}
+    for col in chunks[0].columns:
+        parts = [chunk[col] for chunk in chunks]
+        if isinstance(parts[0].dtype, pd.CategoricalDtype):
+            # Gộp danh mục của các khối, tránh pandas trả về cột object khi nối categorical khác nhau
+            data[col] = pd.Series(union_categoricals(parts, ignore_order=True))
+        else:
+            data[col] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(data)
+
+
+def _downcast_quantity(df):
+    so_luong = df['so_luong']
+    if len(so_luong) and (so_luong % 1 == 0).all() and so_luong.abs().max() < 2**31:
+        df['so_luong'] = so_luong.astype('int32')
+    return df
+
+
+_CELL_KEYS = ['ngay', 'danh_muc', 'ten_san_pham']
+
+
+def _merge_aggregates(cells, orders, chunk_cells, chunk_orders):
+    # Cộng dồn ô của khối mới vào các ô đã có; danh mục / sản phẩm để dạng object vì mỗi khối có bộ category riêng
+    chunk_cells = chunk_cells.astype({'danh_muc': object, 'ten_san_pham': object})
+    chunk_orders = chunk_orders.astype({'danh_muc': object, 'ma_don_hang': object})
+    if cells is None:
+        return chunk_cells, chunk_orders
+    cells = (
+        pd.concat([cells, chunk_cells], ignore_index=True)
+        .groupby(_CELL_KEYS, dropna=False, sort=False)[CUBE_MEASURES + ['so_dong']].sum()
+        .reset_index()
+    )
+    orders = pd.concat([orders, chunk_orders], ignore_index=True).drop_duplicates(ignore_index=True)
+    return cells, orders
+
+
+def read_csv_streaming(buffer, chunk_rows=CSV_CHUNK_ROWS, keep_rows=True):
+    # keep_rows=False: mỗi khối chỉ được tổng hợp thành ô + đơn hàng rồi bỏ đi; kết quả có df=None và cube
+    header = list(pd.read_csv(buffer, nrows=0).columns)
+    matches = []
+    rename, dtype = csv_schema(header, matches)
+    missing_columns = list(set(CANONICAL_COLUMNS) - set(rename.values()))
+    if missing_columns:
+        return IngestResult(None, missing_columns, 0, header_matches=matches)
+    buffer.seek(0)
+
+    reader = pd.read_csv(buffer, usecols=list(rename), dtype=dtype, chunksize=chunk_rows)
+    chunks = []
+    cells = orders = None
+    raw_rows = 0
+    date_format = None
+    for i, chunk in enumerate(reader):
+        raw_rows += len(chunk)
+        chunk = chunk.rename(columns=rename)[CANONICAL_COLUMNS]
+        if i == 0:
+            # Chỉ đoán định dạng ngày một lần, các khối sau dùng lại định dạng này
+            date_format = _guess_date_format(chunk['ngay_dat_hang'])
+        chunk = _clean_chunk(chunk, date_format)
+        if chunk.empty:
+            continue
+        if keep_rows:
+            chunks.append(chunk)
+        else:
+            cells, orders = _merge_aggregates(cells, orders, *build_aggregates(chunk))
+
+    if cells is not None and not cells.empty:
+        return IngestResult(None, None, raw_rows, cube=SalesCube(cells, orders), header_matches=matches)
+    if chunks:
+        df = _downcast_quantity(_concat_chunks(chunks))
+    else:
+        df = pd.DataFrame(columns=CANONICAL_COLUMNS + ['doanh_thu', 'loi_nhuan'])
+    return IngestResult(df, None, raw_rows, header_matches=matches)
+
+
+def read_raw(data, file_name, streaming=True):
+    buffer = io.BytesIO(data)
+    # Đuôi file có thể viết hoa (BAO_CAO.XLSX) nên so sánh không phân biệt hoa thường
+    if file_name.lower().endswith('.xlsx'):
+        if streaming:
+            return read_excel_streaming(buffer)
+        return pd.read_excel(buffer, engine='openpyxl')
+    return pd.read_csv(buffer)
+
+
+def process_raw(df, profiler=NULL_PROFILER):
+    raw_rows = len(df)
+    matches = list(df.attrs.pop('header_matches', []))
+    with profiler.stage('rename_and_validate', rows=raw_rows):
+        is_valid, missing_columns = rename_and_validate(df, matches)
+    matches = unique_matches(matches)
+    if not is_valid:
+        return IngestResult(None, missing_columns, raw_rows, header_matches=matches)
+    if df.empty:
+        return IngestResult(df, None, raw_rows, header_matches=matches)
+    with profiler.stage('calculate_metrics', rows=raw_rows):
+        df = calculate_metrics(df)
+    return IngestResult(df, None, raw_rows, header_matches=matches)
+
+
+def load_dataset(data, file_name, cache=None, columnar_dir=None, profiler=NULL_PROFILER):
+    fingerprint = file_fingerprint(data)
+    extension = file_name.rsplit('.', 1)[-1].lower()
+    # Khóa gồm mã băm nội dung + đuôi file, vì cùng một nội dung có thể được đọc theo 2 cách
+    key = (fingerprint, extension)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    # Workbook Excel: dùng lại bản sao dạng cột trên ổ đĩa nếu đã từng đọc thành công
+    use_columnar = columnar_dir is not None and extension == 'xlsx'
+    result = None
+    if use_columnar:
+        with profiler.stage('read_columnar'):
+            stored = read_columnar(fingerprint, columnar_dir)
+        if stored is not None:
+            result = IngestResult(stored[0], None, stored[1], header_matches=stored[2])
+    if result is None:
+        if extension == 'csv' and len(data) >= CSV_STREAMING_MIN_BYTES:
+            keep_rows = len(data) < CSV_AGGREGATE_ONLY_BYTES
+            with profiler.stage('read_csv_streaming' if keep_rows else 'read_csv_aggregates'):
+                result = read_csv_streaming(io.BytesIO(data), keep_rows=keep_rows)
+        else:
+            with profiler.stage('read_raw'):
+                raw = read_raw(data, file_name)
+            result = process_raw(raw, profiler)
+        if result.df is not None and not result.df.empty:
+            with profiler.stage('sort_by_date', rows=len(result.df)):
+                result = result._replace(df=sort_by_date(result.df))
+        if use_columnar and result.df is not None:
+            with profiler.stage('write_columnar', rows=len(result.df)):
+                write_columnar(fingerprint, result.df, result.raw_rows, columnar_dir, result.header_matches)
+    result = result._replace(fingerprint=fingerprint)
+    if result.df is not None and not result.df.empty:
+        with profiler.stage('build_cube', rows=len(result.df)):
+            cube = SalesCube.from_frame(result.df)
+        with profiler.stage('build_filter_index', rows=len(result.df)):
+            filter_index = FilterIndex(result.df)
+        result = result._replace(cube=cube, filter_index=filter_index)
+
+    if cache is not None:
+        cache.put(key, result)
+    return result
+
+
+def load_store(store, cache=None, profiler=NULL_PROFILER):
+    # Dữ liệu trong kho đã được làm sạch và sắp xếp; khối tổng hợp đọc từ bảng tổng hợp lưu sẵn
+    key = ('store', store.directory, store.version)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    with profiler.stage('store_load'):
+        df = store.load()
+    result = IngestResult(df, None, len(df), fingerprint=f'store-{store.version}')
+    if not df.empty:
+        with profiler.stage('build_cube', rows=len(df)):
+            cube = SalesCube(*store.aggregates())
+        with profiler.stage('build_filter_index', rows=len(df)):
+            filter_index = FilterIndex(df)
+        result = result._replace(cube=cube, filter_index=filter_index)
+    if cache is not None:
+        cache.put(key, result)
+    return result
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+
+import pandas as pd
+
+from cache import LRUCache, estimate_size
+from storage import CACHE_DIR, prune_files
+
+
+MODELS_DIR = os.path.join(CACHE_DIR, 'models')
+
+
+# --- MÃ VÂN TAY CỦA DỮ LIỆU HUẤN LUYỆN + SIÊU THAM SỐ ---
+def training_fingerprint(name, data, params=None):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(name.encode())
+    h.update(json.dumps(params or {}, sort_keys=True, default=str).encode())
+    if isinstance(data, (pd.DataFrame, pd.Series)):
+        columns = list(data.columns) if isinstance(data, pd.DataFrame) else [data.name]
+        h.update(json.dumps(columns, default=str).encode())
+        h.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    else:
+        h.update(repr(data).encode())
+    return h.hexdigest()
+
+
+# --- DUNG LƯỢNG MỘT KẾT QUẢ TRONG RAM ---
+# Mô hình sklearn, dict kết quả... chứa mảng numpy lồng bên trong mà sys.getsizeof không thấy;
+# kích thước khi tuần tự hóa (gần bằng file joblib trên ổ đĩa) sát với RAM thật hơn nhiều
+def serialized_size(value):
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return estimate_size(value)
+
+
+# =========================================================
+# KHO MÔ HÌNH: GHI NHỚ MÔ HÌNH ĐÃ HUẤN LUYỆN VÀ KẾT QUẢ
+# =========================================================
+# Hai tầng: LRU trong RAM (giới hạn dung lượng) + file joblib trên ổ đĩa để dùng lại sau khi khởi động lại.
+class ModelRegistry:
+    def __init__(self, max_bytes, max_disk_bytes, directory=MODELS_DIR):
+        self.memory = LRUCache(max_bytes, sizeof=serialized_size)
+        self.max_disk_bytes = max_disk_bytes
+        self.directory = directory
+        self.disk_hits = 0
+        self.fits = 0
+        self.updates = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.joblib')
+
+    def get_or_compute(self, name, data, params, compute):
+        key = training_fingerprint(name, data, params)
+        value = self._get(key)
+        if value is None:
+            value = compute()
+            self.fits += 1
+            self._put(key, value)
+        return value
+
+    # --- DỮ LIỆU CÓ PHIÊN BẢN (KHO CỘNG DỒN): CẬP NHẬT TỪ KẾT QUẢ CỦA PHIÊN BẢN TRƯỚC ---
+    # update(phien_ban_truoc, ket_qua_truoc) trả về kết quả mới, hoặc None nếu phải tính lại từ đầu bằng compute()
+    def get_or_update(self, name, lineage, version, params, compute, update):
+        key = training_fingerprint(name, (lineage, version), params)
+        value = self._get(key)
+        if value is not None:
+            return value
+        # Con trỏ tới phiên bản mới nhất đã có kết quả của cùng dữ liệu + tham số
+        latest_key = training_fingerprint(f'{name}:latest', lineage, params)
+        latest = self._get(latest_key)
+        if latest is not None and latest < version:
+            previous = self._get(training_fingerprint(name, (lineage, latest), params))
+            if previous is not None:
+                value = update(latest, previous)
+        if value is not None:
+            self.updates += 1
+        else:
+            value = compute()
+            self.fits += 1
+        self._put(key, value)
+        if latest is None or version > latest:
+            self._put(latest_key, version)
+        return value
+
+    def _get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        value = self._load(key)
+        if value is not None:
+            self.disk_hits += 1
+            self.memory.put(key, value)
+        return value
+
+    def _put(self, key, value):
+        self._dump(key, value)
+        self.memory.put(key, value)
+
+    def _load(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        import joblib
+
+        try:
+            value = joblib.load(path)
+        except Exception:
+            # File hỏng hoặc tạo bởi phiên bản thư viện khác: bỏ đi và huấn luyện lại
+            os.remove(path)
+            return None
+        # Cập nhật thời gian sửa đổi để việc dọn dẹp ổ đĩa cũng theo thứ tự LRU
+        os.utime(path)
+        return value
+
+    def _dump(self, key, value):
+        import joblib
+
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        os.close(fd)
+        try:
+            joblib.dump(value, tmp_path)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self._prune_disk()
+
+    def _prune_disk(self):
+        with self._lock:
+            prune_files(os.path.join(self.directory, '*.joblib'), self.max_disk_bytes)
+
+    def stats(self):
+        stats = self.memory.stats()
+        stats['disk_hits'] = self.disk_hits
+        stats['fits'] = self.fits
+        stats['updates'] = self.updates
+        return stats
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+
+PRICE_POINTS = 50
+PRICE_REPORT_COLUMNS = [
+    'ten_san_pham', 'so_muc_gia', 'gia_hien_tai', 'gia_toi_uu', 'chenh_lech_gia',
+    'doanh_thu_hien_tai', 'doanh_thu_du_kien', 'do_co_gian'
+]
+
+
+# =========================================================
+# TỐI ƯU GIÁ CHO TOÀN BỘ SẢN PHẨM CÙNG LÚC
+# =========================================================
+# Cùng mô hình với tab tối ưu giá: so_luong ~ a + b*gia + c*gia^2 trên bảng (giá -> tổng số lượng),
+# nhưng giải nghiệm dạng đóng cho mọi sản phẩm bằng tổng theo nhóm thay vì fit từng sản phẩm.
+# Giá được chuẩn hóa về [-1, 1] trong từng sản phẩm (x = (gia - mid) / half) để hệ phương trình
+# không bị mất độ chính xác khi giá lên tới hàng chục triệu.
+def optimize_prices(df, n_points=PRICE_POINTS):
+    by_price = df.groupby(['ten_san_pham', 'don_gia'], observed=True)['so_luong'].sum().reset_index()
+    codes, products = pd.factorize(by_price['ten_san_pham'])
+    n_levels = np.bincount(codes, minlength=len(products))
+    # Cần ít nhất 3 mức giá khác nhau để vẽ đường cong bậc 2
+    keep = n_levels[codes] > 2
+    if not keep.any():
+        return pd.DataFrame(columns=PRICE_REPORT_COLUMNS)
+    by_price = by_price[keep]
+    codes, products = pd.factorize(by_price['ten_san_pham'])
+    n_prod = len(products)
+    price = by_price['don_gia'].to_numpy(dtype='float64')
+    qty = by_price['so_luong'].to_numpy(dtype='float64')
+
+    p_min = np.full(n_prod, np.inf)
+    p_max = np.full(n_prod, -np.inf)
+    np.minimum.at(p_min, codes, price)
+    np.maximum.at(p_max, codes, price)
+    mid, half = (p_min + p_max) / 2, (p_max - p_min) / 2
+    x = (price - mid[codes]) / half[codes]
+
+    # Ma trận chuẩn X'X và X'y của từng sản phẩm từ các mômen sum(x^k), sum(x^k * q)
+    moments = np.stack([np.bincount(codes, weights=x ** k, minlength=n_prod) for k in range(5)], axis=1)
+    targets = np.stack([np.bincount(codes, weights=qty * x ** k, minlength=n_prod) for k in range(3)], axis=1)
+    XtX = np.stack([moments[:, i:i + 3] for i in range(3)], axis=1)
+    coef = np.einsum('pij,pj->pi', np.linalg.pinv(XtX), targets)
+
+    # Đánh giá n_points mức giá thử cho mọi sản phẩm cùng lúc
+    steps = np.linspace(0, 1, n_points)
+    test_prices = (p_min * 0.8)[:, None] + ((p_max * 1.2) - (p_min * 0.8))[:, None] * steps[None, :]
+    pred_rev = test_prices * _predict(coef, mid, half, test_prices)
+    best_idx = np.argmax(pred_rev, axis=1)
+    rows = np.arange(n_prod)
+
+    sold = np.bincount(codes, weights=qty, minlength=n_prod)
+    revenue = np.bincount(codes, weights=price * qty, minlength=n_prod)
+    current_price = np.divide(revenue, sold, out=np.zeros(n_prod), where=sold != 0)
+    # Độ co giãn của cầu theo giá tại mức giá hiện tại: (dq/dp) * p / q
+    current_qty = _predict(coef, mid, half, current_price[:, None])[:, 0]
+    x_current = (current_price - mid) / half
+    slope = (coef[:, 1] + 2 * coef[:, 2] * x_current) / half
+    elasticity = np.divide(slope * current_price, current_qty, out=np.full(n_prod, np.nan), where=current_qty != 0)
+
+    best_price = test_prices[rows, best_idx]
+    table = pd.DataFrame({
+        'ten_san_pham': np.asarray(products),
+        'so_muc_gia': np.bincount(codes, minlength=n_prod),
+        'gia_hien_tai': current_price,
+        'gia_toi_uu': best_price,
+        'chenh_lech_gia': np.divide(best_price - current_price, current_price,
+                                    out=np.full(n_prod, np.nan), where=current_price != 0) * 100,
+        'doanh_thu_hien_tai': revenue,
+        'doanh_thu_du_kien': pred_rev[rows, best_idx],
+        'do_co_gian': elasticity,
+        'gia_min': p_min,
+        'gia_max': p_max,
+        'he_so_a': coef[:, 0],
+        'he_so_b': coef[:, 1],
+        'he_so_c': coef[:, 2],
+    })
+    return table
+
+
+def _predict(coef, mid, half, prices):
+    x = (prices - mid[:, None]) / half[:, None]
+    return coef[:, [0]] + coef[:, [1]] * x + coef[:, [2]] * x ** 2
+
+
+def demand_curve(row, n_points=PRICE_POINTS):
+    # Vẽ lại đường cong doanh thu của một sản phẩm từ hệ số đã lưu trong bảng
+    coef = np.array([[row['he_so_a'], row['he_so_b'], row['he_so_c']]])
+    mid = np.array([(row['gia_min'] + row['gia_max']) / 2])
+    half = np.array([(row['gia_max'] - row['gia_min']) / 2])
+    test_prices = np.linspace(row['gia_min'] * 0.8, row['gia_max'] * 1.2, n_points)
+    pred_rev = test_prices * _predict(coef, mid, half, test_prices[None, :])[0]
+    return test_prices, pred_rev, int(np.argmax(pred_rev))
@@ -0,0 +1,117 @@
+import json
+import threading
+import time
+import tracemalloc
+import weakref
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+
+
+PROFILE_COLUMNS = ['giai_doan', 'cap', 'thoi_gian_ms', 'bo_nho_tang_mb', 'bo_nho_dinh_mb', 'so_dong']
+
+# tracemalloc là của cả tiến trình: nhiều profiler (nhiều phiên Streamlit) dùng chung, đếm số người dùng
+# và chỉ tắt khi người cuối cùng xong, và chỉ khi chính chúng ta đã bật (không tắt tracemalloc của người khác)
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_owned = False
+
+
+def _acquire_tracing():
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_owned = True
+        _tracing_users += 1
+
+
+def _release_tracing():
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_owned:
+            tracemalloc.stop()
+            _tracing_owned = False
+
+
+# =========================================================
+# ĐO THỜI GIAN VÀ BỘ NHỚ CỦA TỪNG GIAI ĐOẠN XỬ LÝ
+# =========================================================
+# Dùng: with profiler.stage('calculate_metrics', rows=len(df)): ...
+# Các giai đoạn có thể lồng nhau (cap = độ sâu). Đo bộ nhớ dùng tracemalloc nên chậm hơn đáng kể,
+# chỉ bật khi cần (trace_memory=True); khi đó bộ nhớ là phần cấp phát bởi Python/NumPy/pandas.
+# Bộ đếm đỉnh cũng là của cả tiến trình: khi nhiều phiên cùng đo, đỉnh bộ nhớ chỉ là gần đúng.
+class StageProfiler:
+    enabled = True
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.records = []
+        self._stack = []
+        self._release_tracing = None
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        if self.trace_memory and self._release_tracing is None:
+            _acquire_tracing()
+            # Trả lại cả khi lượt chạy bị ngắt trước khi gọi stop() (profiler bị thu gom)
+            self._release_tracing = weakref.finalize(self, _release_tracing)
+        frame = {'peak': 0, 'current': 0}
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # Đỉnh của giai đoạn cha tính đến lúc này được giữ lại trước khi đặt lại bộ đếm đỉnh
+            if self._stack:
+                self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+            tracemalloc.reset_peak()
+            frame['current'] = current
+        record = {'giai_doan': name, 'cap': len(self._stack), 'thoi_gian_ms': None,
+                  'bo_nho_tang_mb': None, 'bo_nho_dinh_mb': None, 'so_dong': rows}
+        # Ghi theo thứ tự bắt đầu để giai đoạn cha đứng trước giai đoạn con
+        self.records.append(record)
+        self._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['thoi_gian_ms'] = (time.perf_counter() - start) * 1000
+            self._stack.pop()
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                peak = max(frame['peak'], peak)
+                record['bo_nho_tang_mb'] = (current - frame['current']) / 1024**2
+                record['bo_nho_dinh_mb'] = (peak - frame['current']) / 1024**2
+                if self._stack:
+                    self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+
+    def stop(self):
+        if self._release_tracing is not None:
+            self._release_tracing()
+            self._release_tracing = None
+
+    def summary(self):
+        return pd.DataFrame(self.records, columns=PROFILE_COLUMNS)
+
+    def to_json(self, **meta):
+        return json.dumps({'meta': meta, 'stages': self.records}, ensure_ascii=False, indent=2, default=str)
+
+
+# --- PHIÊN BẢN KHÔNG LÀM GÌ: DÙNG MẶC ĐỊNH ĐỂ CÁC HÀM KHÔNG PHẢI KIỂM TRA None ---
+class NullProfiler:
+    enabled = False
+    records = []
+
+    def stage(self, name, rows=None):
+        return nullcontext({})
+
+    def stop(self):
+        pass
+
+    def summary(self):
+        return pd.DataFrame(columns=PROFILE_COLUMNS)
+
+    def to_json(self, **meta):
+        return json.dumps({'meta': meta, 'stages': []})
+
+
+NULL_PROFILER = NullProfiler()
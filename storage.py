@@ -0,0 +1,303 @@
+import glob
+import json
+import os
+import tempfile
+import threading
+from collections import namedtuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from aggregation import build_aggregates
+
+
+# Thư mục lưu bản sao dạng cột (Arrow IPC) của các file đã làm sạch
+CACHE_DIR = os.environ.get(
+    'DASHBOARD_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+)
+COLUMNAR_DIR = os.path.join(CACHE_DIR, 'columnar')
+# Tổng dung lượng tối đa của các bản sao dạng cột; vượt quá thì xóa các bản lâu chưa được dùng nhất
+COLUMNAR_MAX_BYTES = 2 * 1024 * 1024 * 1024
+# Phiên bản cách làm sạch / nhận diện tiêu đề: nằm trong tên file nên bản sao ghi bởi phiên bản cũ
+# (trước khi đổi cách so khớp tiêu đề, đổi kiểu dữ liệu...) không bao giờ được đọc lại, chỉ chờ bị xóa.
+# Tăng số này mỗi khi kết quả làm sạch của cùng một file có thể khác đi.
+COLUMNAR_VERSION = 2
+# Thư mục kho dữ liệu cộng dồn (chế độ append)
+STORE_DIR = os.path.join(CACHE_DIR, 'store')
+
+_RAW_ROWS_KEY = b'raw_rows'
+_HEADER_MATCHES_KEY = b'header_matches'
+
+
+# =========================================================
+# BỘ NHỚ ĐỆM DẠNG CỘT TRÊN Ổ ĐĨA
+# =========================================================
+def columnar_path(key, directory=COLUMNAR_DIR):
+    return os.path.join(directory, f'{key}.v{COLUMNAR_VERSION}.arrow')
+
+
+def prune_files(pattern, max_bytes):
+    # Xóa các file cũ nhất (theo lần dùng gần nhất = mtime) đến khi tổng dung lượng không vượt max_bytes
+    files = []
+    for path in glob.glob(pattern):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+
+
+def read_columnar(key, directory=COLUMNAR_DIR):
+    path = columnar_path(key, directory)
+    if not os.path.exists(path):
+        return None
+    try:
+        # Ánh xạ bộ nhớ (memory-map) thay vì đọc cả file vào RAM
+        table = feather.read_table(path, memory_map=True)
+        # Đánh dấu vừa dùng để khi dọn dẹp các bản hay dùng được giữ lại
+        os.utime(path)
+    except (pa.ArrowException, OSError):
+        return None
+    metadata = table.schema.metadata or {}
+    raw_rows = int(metadata.get(_RAW_ROWS_KEY, table.num_rows))
+    header_matches = [tuple(match) for match in json.loads(metadata.get(_HEADER_MATCHES_KEY, b'[]'))]
+    return table.to_pandas(), raw_rows, header_matches
+
+
+def write_columnar(key, df, raw_rows, directory=COLUMNAR_DIR, header_matches=None, max_bytes=COLUMNAR_MAX_BYTES):
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowException, TypeError, ValueError):
+        # Cột có kiểu dữ liệu hỗn hợp không chuyển được sang Arrow: bỏ qua, lần sau đọc lại file gốc
+        return False
+    metadata = dict(table.schema.metadata or {})
+    metadata[_RAW_ROWS_KEY] = str(raw_rows).encode()
+    metadata[_HEADER_MATCHES_KEY] = json.dumps(header_matches or [], ensure_ascii=False).encode()
+    table = table.replace_schema_metadata(metadata)
+    written = write_table(table, columnar_path(key, directory))
+    # Mọi file .arrow trong thư mục đều được tính, kể cả bản của phiên bản cũ (chúng bị xóa trước vì cũ hơn)
+    prune_files(os.path.join(directory, '*.arrow'), max_bytes)
+    return written
+
+
+def write_table(table, path):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    # Ghi ra file tạm rồi đổi tên để không bao giờ để lại file hỏng khi bị ngắt giữa chừng
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    os.close(fd)
+    try:
+        # Không nén để có thể memory-map trực tiếp khi đọc lại
+        feather.write_feather(table, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+    return True
+
+
+def read_table(path):
+    if not os.path.exists(path):
+        return None
+    return feather.read_table(path, memory_map=True).to_pandas()
+
+
+# =========================================================
+# KHO DỮ LIỆU CỘNG DỒN (APPEND/MERGE) THEO THÁNG
+# =========================================================
+STORE_COLUMNS = [
+    'ngay_dat_hang', 'ma_don_hang', 'ten_san_pham', 'danh_muc',
+    'so_luong', 'don_gia', 'chi_phi', 'doanh_thu', 'loi_nhuan'
+]
+STORE_TEXT_COLUMNS = ['ma_don_hang', 'ten_san_pham', 'danh_muc']
+# Một dòng được xác định bởi mã đơn hàng + sản phẩm; dòng mới ghi đè dòng cũ cùng khóa
+STORE_KEY = ['ma_don_hang', 'ten_san_pham']
+# Số lần cộng dồn gần nhất được ghi lại các ngày thay đổi (để mô hình chỉ cập nhật phần thay đổi)
+STORE_CHANGE_LOG = 50
+
+# added_rows: số dòng mới; replaced_rows: số dòng cũ bị ghi đè
+# affected_dates: các ngày có dữ liệu thay đổi (để cập nhật lại tổng hợp, dự báo, điểm bất thường)
+# skipped: True nếu file này đã từng được cộng vào kho
+AppendReport = namedtuple('AppendReport', ['added_rows', 'replaced_rows', 'affected_dates', 'skipped'])
+
+
+def to_store_schema(df):
+    # Kiểu dữ liệu cố định để các phân vùng từ nhiều file khác nhau luôn nối được với nhau
+    out = pd.DataFrame({'ngay_dat_hang': df['ngay_dat_hang'].astype('datetime64[ns]')})
+    for col in STORE_COLUMNS[1:]:
+        if col in STORE_TEXT_COLUMNS:
+            out[col] = df[col].astype('string')
+        else:
+            out[col] = df[col].astype('float64')
+    return out
+
+
+class OrderStore:
+    def __init__(self, directory=STORE_DIR):
+        self.directory = directory
+        self._manifest_path = os.path.join(directory, 'manifest.json')
+        self._cells_path = os.path.join(directory, 'cells.arrow')
+        self._orders_path = os.path.join(directory, 'order_keys.arrow')
+        # Chỉ mục khóa -> tháng của mọi dòng trong kho: biết dòng cũ cùng khóa nằm ở phân vùng nào
+        self._keys_path = os.path.join(directory, 'keys.arrow')
+        self.manifest = self._read_manifest()
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        return self.manifest['version']
+
+    @property
+    def empty(self):
+        return not self._partition_paths()
+
+    def _read_manifest(self):
+        if os.path.exists(self._manifest_path):
+            with open(self._manifest_path, encoding='utf-8') as f:
+                return json.load(f)
+        return {'version': 0, 'sources': [], 'changes': [], 'cleared_version': 0}
+
+    def _write_manifest(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self._manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp_path, self._manifest_path)
+
+    def _partition_path(self, month):
+        return os.path.join(self.directory, f'orders-{month}.arrow')
+
+    def _partition_paths(self):
+        # Tên file dạng orders-YYYY-MM nên sắp xếp theo tên cũng là theo thời gian
+        return sorted(glob.glob(os.path.join(self.directory, 'orders-*.arrow')))
+
+    def load(self):
+        parts = [read_table(path) for path in self._partition_paths()]
+        if not parts:
+            return to_store_schema(pd.DataFrame(columns=STORE_COLUMNS))
+        # Mỗi phân vùng đã sắp xếp theo ngày nên nối theo thứ tự tháng là đã sắp xếp toàn bộ
+        return to_store_schema(pd.concat(parts, ignore_index=True))
+
+    def aggregates(self):
+        cells, orders = read_table(self._cells_path), read_table(self._orders_path)
+        if cells is None or orders is None:
+            return build_aggregates(self.load())
+        return cells, orders
+
+    def append(self, df, source=None):
+        with self._lock:
+            return self._append(df, source)
+
+    def _read_keys(self):
+        keys = read_table(self._keys_path)
+        if keys is None:
+            # Kho tạo trước khi có chỉ mục khóa: dựng lại một lần từ các phân vùng
+            parts = [
+                read_table(path)[STORE_KEY].assign(thang=os.path.basename(path)[len('orders-'):-len('.arrow')])
+                for path in self._partition_paths()
+            ]
+            keys = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=STORE_KEY + ['thang'])
+        return keys.astype('string')
+
+    def _append(self, df, source):
+        if source is not None and source in self.manifest['sources']:
+            return AppendReport(0, 0, [], True)
+        new = to_store_schema(df).drop_duplicates(STORE_KEY, keep='last')
+        month = new['ngay_dat_hang'].dt.strftime('%Y-%m')
+        new_keys = pd.MultiIndex.from_frame(new[STORE_KEY])
+
+        # Phân vùng cần ghi lại: các tháng có dữ liệu mới + các tháng đang chứa dòng cũ cùng khóa
+        # (dòng đổi ngày sang tháng khác, ví dụ 31/01 -> 01/02, phải bị xóa khỏi tháng cũ)
+        keys = self._read_keys()
+        stored = pd.MultiIndex.from_frame(keys[STORE_KEY]).isin(new_keys)
+        months = sorted(set(month) | set(keys.loc[stored, 'thang']))
+
+        replaced_rows = 0
+        affected = []
+        changed_rows = []
+        for key in months:
+            part = new[month == key]
+            old = read_table(self._partition_path(key))
+            if old is not None:
+                old = to_store_schema(old)
+                overlap = pd.MultiIndex.from_frame(old[STORE_KEY]).isin(new_keys)
+                replaced_rows += int(overlap.sum())
+                affected.append(old.loc[overlap, 'ngay_dat_hang'])
+                merged = pd.concat([old[~overlap], part], ignore_index=True)
+            else:
+                merged = part
+            if merged.empty:
+                os.remove(self._partition_path(key))
+                continue
+            merged = merged.sort_values('ngay_dat_hang', kind='stable', ignore_index=True)
+            write_table(pa.Table.from_pandas(merged, preserve_index=False), self._partition_path(key))
+            affected.append(part['ngay_dat_hang'])
+            changed_rows.append(merged)
+        added_rows = len(new) - replaced_rows
+
+        keys = pd.concat(
+            [keys[~stored], new[STORE_KEY].assign(thang=month)], ignore_index=True
+        ).astype('string')
+        write_table(pa.Table.from_pandas(keys, preserve_index=False), self._keys_path)
+
+        affected_dates = pd.DatetimeIndex([])
+        if affected:
+            affected_dates = pd.DatetimeIndex(pd.concat(affected).dt.floor('D').unique()).sort_values()
+            self._update_aggregates(pd.concat(changed_rows, ignore_index=True), affected_dates)
+
+        if source is not None:
+            self.manifest['sources'].append(source)
+        self.manifest['version'] += 1
+        changes = self.manifest.setdefault('changes', [])
+        changes.append({'version': self.manifest['version'], 'dates': [str(day.date()) for day in affected_dates]})
+        del changes[:-STORE_CHANGE_LOG]
+        self._write_manifest()
+        return AppendReport(added_rows, replaced_rows, list(affected_dates), False)
+
+    def changed_dates(self, since_version):
+        # Các ngày có dữ liệu thay đổi sau phiên bản since_version; None nếu không biết chắc
+        # (kho đã bị xóa sau đó, hoặc nhật ký thay đổi không còn đủ các phiên bản) -> phải tính lại từ đầu
+        manifest = self.manifest
+        if since_version < manifest.get('cleared_version', 0) or since_version > manifest['version']:
+            return None
+        changes = {change['version']: change['dates'] for change in manifest.get('changes', [])}
+        versions = range(since_version + 1, manifest['version'] + 1)
+        if any(version not in changes for version in versions):
+            return None
+        dates = [day for version in versions for day in changes[version]]
+        return pd.DatetimeIndex(sorted(set(dates)))
+
+    def _update_aggregates(self, changed_rows, affected_dates):
+        # Chỉ tính lại tổng hợp cho các ngày bị ảnh hưởng, giữ nguyên phần còn lại
+        rows = changed_rows[changed_rows['ngay_dat_hang'].dt.floor('D').isin(affected_dates)]
+        new_cells, new_orders = build_aggregates(rows)
+        cells, orders = read_table(self._cells_path), read_table(self._orders_path)
+        if cells is not None and orders is not None:
+            new_cells = pd.concat([cells[~cells['ngay'].isin(affected_dates)], new_cells], ignore_index=True)
+            new_orders = pd.concat([orders[~orders['ngay'].isin(affected_dates)], new_orders], ignore_index=True)
+        new_cells = new_cells.sort_values('ngay', kind='stable', ignore_index=True)
+        write_table(pa.Table.from_pandas(new_cells, preserve_index=False), self._cells_path)
+        write_table(pa.Table.from_pandas(new_orders, preserve_index=False), self._orders_path)
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        for path in self._partition_paths() + [self._cells_path, self._orders_path, self._keys_path]:
+            if os.path.exists(path):
+                os.remove(path)
+        version = self.manifest['version'] + 1
+        self.manifest = {'version': version, 'sources': [], 'changes': [], 'cleared_version': version}
+        self._write_manifest()
@@ -0,0 +1,17 @@
+import pytest
+
+from benchmarks.synthetic import make_sales, to_csv_bytes
+from ingestion import load_dataset
+
+
+# Dữ liệu nhỏ dùng chung: đủ nhiều ngày / danh mục / đơn hàng nhiều dòng để so với pandas thuần
+@pytest.fixture(scope='session')
+def sales_csv():
+    return to_csv_bytes(make_sales(3_000, n_products=60, n_days=120, seed=1))
+
+
+@pytest.fixture(scope='session')
+def sales(sales_csv):
+    result = load_dataset(sales_csv, 'ban_hang.csv')
+    assert result.missing_columns is None
+    return result
@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+
+
+SELECTIONS = [
+    (None, '2024-01-01', '2024-04-29'),
+    (['Sách', 'Điện tử'], '2024-02-01', '2024-03-15'),
+    (['Mỹ phẩm'], '2024-03-10', '2024-03-10'),
+    (['Không có danh mục này'], '2024-01-01', '2024-04-29'),
+    (None, '2025-01-01', '2025-02-01'),
+]
+
+
+def _select(sales, categories, start, end):
+    df = sales.df
+    categories = list(df['danh_muc'].unique()) if categories is None else categories
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    day = df['ngay_dat_hang'].dt.floor('D')
+    expected = df[df['danh_muc'].isin(categories) & (day >= start) & (day <= end)]
+    return categories, start, end, expected
+
+
+@pytest.mark.parametrize('categories, start, end', SELECTIONS)
+def test_filter_index_matches_boolean_mask(sales, categories, start, end):
+    categories, start, end, expected = _select(sales, categories, start, end)
+    pd.testing.assert_frame_equal(sales.filter_index.select(categories, start, end), expected)
+
+
+@pytest.mark.parametrize('categories, start, end', SELECTIONS)
+def test_cube_matches_pandas(sales, categories, start, end):
+    categories, start, end, expected = _select(sales, categories, start, end)
+    selection = sales.cube.select(categories, start, end)
+
+    totals = selection.totals()
+    for col in ['doanh_thu', 'loi_nhuan', 'so_luong']:
+        assert totals[col] == pytest.approx(expected[col].sum())
+    assert selection.order_count() == expected['ma_don_hang'].nunique()
+
+    by_date = selection.revenue_by_date()
+    if expected.empty:
+        assert by_date.empty
+    else:
+        resampled = expected.set_index('ngay_dat_hang')['doanh_thu'].resample('D').sum()
+        assert list(by_date['ngay_dat_hang']) == list(resampled.index)
+        assert by_date['doanh_thu'].to_numpy() == pytest.approx(resampled.to_numpy())
+
+    by_product = selection.profit_by_product().set_index('ten_san_pham')['loi_nhuan'].sort_index()
+    expected_product = expected.groupby('ten_san_pham', observed=True)['loi_nhuan'].sum().sort_index()
+    assert list(by_product.index) == list(expected_product.index)
+    assert by_product.to_numpy() == pytest.approx(expected_product.to_numpy())
+
+    by_category = selection.revenue_by_category().set_index('danh_muc')['doanh_thu'].sort_index()
+    expected_category = expected.groupby('danh_muc', observed=True)['doanh_thu'].sum().sort_index()
+    assert list(by_category.index) == list(expected_category.index)
+    assert by_category.to_numpy() == pytest.approx(expected_category.to_numpy())
+
+
+def test_labeled_cells_use_real_labels(sales):
+    categories, start, end, expected = _select(sales, ['Sách', 'Thời trang'], '2024-01-15', '2024-02-15')
+    cells = sales.cube.select(categories, start, end).labeled_cells()
+    keys = ['ngay', 'danh_muc', 'ten_san_pham']
+    got = cells.astype({'danh_muc': object, 'ten_san_pham': object}).groupby(keys)['doanh_thu'].sum()
+    want = (expected.assign(ngay=expected['ngay_dat_hang'].dt.floor('D'))
+            .astype({'danh_muc': object, 'ten_san_pham': object})
+            .groupby(keys)['doanh_thu'].sum())
+    assert list(got.index) == list(want.index)
+    assert got.to_numpy() == pytest.approx(want.to_numpy())
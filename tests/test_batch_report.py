@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+
+from batch_report import TOTAL_LABEL, find_inputs, main
+from benchmarks.synthetic import make_sales, to_csv_bytes, to_xlsx_bytes
+
+
+def test_report_with_tiny_branch(tmp_path):
+    inputs = tmp_path / 'chi_nhanh'
+    inputs.mkdir()
+    (inputs / 'ha_noi.csv').write_bytes(to_csv_bytes(make_sales(400, n_products=20, n_days=60, seed=2)))
+    # Quá ít dòng để chấm điểm bất thường
+    (inputs / 'nho.csv').write_bytes(to_csv_bytes(make_sales(8, n_products=3, n_days=5)))
+    (inputs / 'DA_NANG.XLSX').write_bytes(to_xlsx_bytes(make_sales(300, n_products=20, n_days=60, seed=4)))
+    (inputs / '~$ha_noi.xlsx').write_bytes(b'')
+    assert [path.rsplit('/', 1)[-1] for path in find_inputs(str(inputs))] == ['DA_NANG.XLSX', 'ha_noi.csv', 'nho.csv']
+
+    output = tmp_path / 'bao_cao'
+    assert main([str(inputs), '-o', str(output), '--workers', '1', '--top-n', '2', '--future-days', '7']) == 0
+
+    kpi = pd.read_csv(output / 'tong_hop_kpi.csv', encoding='utf-8-sig').set_index('chi_nhanh')
+    assert set(kpi.index) == {'ha_noi', 'nho', 'DA_NANG', TOTAL_LABEL}
+    assert (kpi['trang_thai'] == 'ok').all()
+    assert kpi.loc['nho', 'so_giao_dich_bat_thuong'] == 0
+    assert kpi.loc[TOTAL_LABEL, 'tong_doanh_thu'] == kpi.drop(TOTAL_LABEL)['tong_doanh_thu'].sum()
+
+    tiny = pd.read_csv(output / 'nho' / 'bat_thuong.csv', encoding='utf-8-sig')
+    assert tiny.empty and 'diem_bat_thuong' in tiny.columns
+
+    combined = pd.read_csv(output / 'tong_hop_bat_thuong.csv', encoding='utf-8-sig')
+    assert set(combined['chi_nhanh']) <= {'ha_noi', 'DA_NANG'}
+    assert len(combined) == kpi.drop(TOTAL_LABEL)['so_giao_dich_bat_thuong'].sum()
+    assert (output / 'tong_hop_du_bao.csv').exists()
+
+
+def test_recursive_run_skips_its_own_reports(tmp_path):
+    inputs = tmp_path / 'chi_nhanh'
+    (inputs / 'mien_bac').mkdir(parents=True)
+    (inputs / 'mien_bac' / 'ha_noi.csv').write_bytes(to_csv_bytes(make_sales(200, n_products=10, n_days=30, seed=5)))
+    options = [str(inputs), '--recursive', '--workers', '1', '--top-n', '1', '--future-days', '3']
+    assert main(options) == 0
+    # Lần chạy thứ hai: báo cáo mặc định nằm trong <input_dir>/bao_cao và không được đọc như một chi nhánh
+    assert main(options) == 0
+    kpi = pd.read_csv(inputs / 'bao_cao' / 'tong_hop_kpi.csv', encoding='utf-8-sig')
+    assert list(kpi['chi_nhanh']) == ['ha_noi', TOTAL_LABEL]
+    assert [path.rsplit('/', 1)[-1] for path in find_inputs(str(inputs), True, str(inputs / 'bao_cao'))] == ['ha_noi.csv']
+    # Thư mục báo cáo trùng thư mục dữ liệu thì không loại gì
+    assert len(find_inputs(str(inputs), True, str(inputs))) > 1
+
+
+def test_total_forecast_only_on_dates_every_branch_covers(tmp_path):
+    inputs = tmp_path / 'chi_nhanh'
+    inputs.mkdir()
+    # Hai chi nhánh kết thúc ở hai ngày khác nhau nên hai khoảng dự báo chỉ chồng lên nhau một phần
+    (inputs / 'a.csv').write_bytes(to_csv_bytes(make_sales(300, n_products=10, n_days=40, seed=6)))
+    (inputs / 'b.csv').write_bytes(to_csv_bytes(make_sales(300, n_products=10, n_days=45, seed=7)))
+    output = tmp_path / 'bao_cao'
+    assert main([str(inputs), '-o', str(output), '--workers', '1', '--top-n', '1', '--future-days', '10']) == 0
+
+    forecast = pd.read_csv(output / 'tong_hop_du_bao.csv', encoding='utf-8-sig')
+    predicted = forecast[(forecast['loai'] != 'Thực tế') & (forecast['chi_nhanh'] != TOTAL_LABEL)]
+    by_branch = predicted.pivot(index='ngay_dat_hang', columns='chi_nhanh', values='doanh_thu')
+    common = by_branch.dropna()
+    assert 0 < len(common) < len(by_branch)
+    total = forecast[forecast['chi_nhanh'] == TOTAL_LABEL].set_index('ngay_dat_hang')['doanh_thu']
+    assert list(total.index) == list(common.index)
+    assert total.to_numpy() == pytest.approx(common.sum(axis=1).to_numpy())
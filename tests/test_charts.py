@@ -0,0 +1,27 @@
+import pandas as pd
+import plotly.express as px
+import plotly.io
+
+from charts import RenderMonitor, figure_payload_bytes, table_payload_bytes
+
+
+def test_monitor_measures_only_when_enabled():
+    fig = px.line(x=[1, 2, 3], y=[4, 5, 6])
+    df = pd.DataFrame({'a': range(5)})
+    to_json = plotly.io.to_json
+
+    disabled = RenderMonitor(enabled=False)
+    rendered = []
+    disabled.figure('bieu_do', fig, lambda: rendered.append('fig'))
+    disabled.table('bang', df, lambda: rendered.append('df'))
+    assert rendered == ['fig', 'df'] and disabled.summary().empty
+
+    enabled = RenderMonitor()
+    enabled.figure('bieu_do', fig, lambda: None)
+    enabled.table('bang', df, lambda: None)
+    summary = enabled.summary().set_index('thanh_phan')
+    assert list(summary['so_diem']) == [3, 5]
+    assert summary.loc['bieu_do', 'dung_luong_kb'] * 1024 == figure_payload_bytes(fig)
+    assert summary.loc['bang', 'dung_luong_kb'] * 1024 == table_payload_bytes(df)
+    # Không thay thế hàm nào của thư viện bên ngoài
+    assert plotly.io.to_json is to_json
@@ -0,0 +1,83 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import export
+from cache import LRUCache
+from export import EXPORT_FORMATS, export_frame
+
+
+@pytest.fixture
+def frame():
+    n = 23
+    return pd.DataFrame({
+        'ngay_dat_hang': pd.date_range('2024-01-01', periods=n, freq='D'),
+        'ten_san_pham': [f'Sản phẩm {i}' for i in range(n)],
+        'so_luong': np.arange(n),
+        'doanh_thu': np.linspace(0, 1e7, n),
+    })
+
+
+def read_back(data, fmt):
+    if fmt == 'parquet':
+        return pd.read_parquet(io.BytesIO(data))
+    if fmt == 'xlsx':
+        sheets = pd.read_excel(io.BytesIO(data), sheet_name=None)
+        return pd.concat(sheets.values(), ignore_index=True)
+    return pd.read_csv(io.BytesIO(data), encoding='utf-8-sig', parse_dates=['ngay_dat_hang'],
+                       compression='gzip' if fmt == 'csv.gz' else None)
+
+
+@pytest.mark.parametrize('spool_bytes', [export.EXPORT_SPOOL_BYTES, 64])
+@pytest.mark.parametrize('fmt', list(EXPORT_FORMATS))
+def test_round_trip(frame, fmt, spool_bytes):
+    # Khúc nhỏ để dữ liệu đi qua nhiều khúc / row group; spool_bytes nhỏ: chuyển xuống file tạm giữa chừng
+    result = export_frame(frame, fmt, chunk_rows=5, spool_bytes=spool_bytes)
+    assert (result._file is not None) == (spool_bytes == 64)
+    assert result.size == len(result.read())
+    pd.testing.assert_frame_equal(read_back(result.read(), fmt), frame, check_dtype=False)
+
+
+def test_xlsx_splits_rows_over_sheets(frame, monkeypatch):
+    monkeypatch.setattr(export, 'XLSX_MAX_ROWS', 10)
+    data = export_frame(frame, 'xlsx', chunk_rows=4).read()
+    assert len(pd.read_excel(io.BytesIO(data), sheet_name=None)) == 3
+    pd.testing.assert_frame_equal(read_back(data, 'xlsx'), frame, check_dtype=False)
+
+
+def test_parquet_schema_comes_from_whole_frame():
+    # Khúc đầu toàn ô trống: lược đồ lấy từ khúc đầu sẽ là kiểu null và khúc sau không ghi được
+    df = pd.DataFrame({
+        'ghi_chu': pd.Series([None] * 6 + ['giao nhanh', 'khách quen'], dtype=object),
+        'trong': pd.Series([None] * 8, dtype=object),
+        'so_luong': range(8),
+    })
+    back = pd.read_parquet(io.BytesIO(export_frame(df, 'parquet', chunk_rows=3).read()))
+    assert list(back['ghi_chu'])[-2:] == ['giao nhanh', 'khách quen']
+    assert back['trong'].isna().all()
+
+
+def test_spooled_to_disk_and_closed(frame):
+    result = export_frame(frame, 'csv', spool_bytes=64)
+    assert result.read() == result.read() and len(result.read()) == result.size
+    result.close()
+    assert result.read() is None
+
+    small = export_frame(frame, 'csv')
+    assert small.read() is small.read()
+    small.close()
+    assert small.read() is None
+
+
+def test_cache_closes_dropped_exports(frame):
+    files = [export_frame(frame, 'csv') for _ in range(3)]
+    cache = LRUCache(max_bytes=files[0].size * 2, sizeof=lambda f: f.size, on_evict=lambda f: f.close())
+    cache.put('a', files[0])
+    cache.put('b', files[1])
+    cache.put('c', files[2])
+    assert files[0].read() is None
+    assert cache.pop('b') is files[1] and files[1].read() is not None
+    cache.clear()
+    assert files[2].read() is None
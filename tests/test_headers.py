@@ -0,0 +1,49 @@
+import pytest
+
+from headers import CANONICAL_COLUMNS, resolve_headers
+
+
+@pytest.mark.parametrize('header, canonical', [
+    ('Ngày đặt hàng', 'ngay_dat_hang'),
+    (' NGÀY ĐẶT HÀNG ', 'ngay_dat_hang'),
+    ('Ngày đặt hàng (dd/mm/yyyy)', 'ngay_dat_hang'),
+    ('Order ID', 'ma_don_hang'),
+    ('Mã ĐH', 'ma_don_hang'),
+    ('Tên SP', 'ten_san_pham'),
+    ('Tên hàng', 'ten_san_pham'),
+    ('Phân loại', 'danh_muc'),
+    ('SoLuong', 'so_luong'),
+    ('Số lươngg', 'so_luong'),
+    ('Đơn giá (VNĐ)', 'don_gia'),
+    ('Giá vốn', 'chi_phi'),
+    ('Chi phi/don vi', 'chi_phi'),
+])
+def test_known_headers(header, canonical):
+    assert resolve_headers([header]) == [canonical]
+
+
+# Tên gần giống nhưng khác nghĩa: không được gán cho cột chuẩn nào
+@pytest.mark.parametrize('header', [
+    'Tên khách hàng', 'Ngày giao hàng', 'Chi phí vận chuyển', 'Số lượng tồn', 'Mã sản phẩm',
+    'Ngày', 'Giá', 'Product', 'Date', 'shipping_cost', 'Ghi chú',
+])
+def test_unrelated_headers_are_not_matched(header):
+    assert resolve_headers([header])[0] not in CANONICAL_COLUMNS
+
+
+def test_lookalike_does_not_take_real_column():
+    header = ['Ngày giao hàng', 'Ngày đặt hàng', 'Tên khách hàng', 'Tên sản phẩm']
+    assert resolve_headers(header) == ['ngay_giao_hang', 'ngay_dat_hang', 'ten_khach_hang', 'ten_san_pham']
+
+
+def test_each_canonical_column_assigned_once():
+    assert resolve_headers(['Số lượng', 'Số lượng', 'SL']) == ['so_luong', 'so_luong_1', 'sl']
+
+
+def test_only_fuzzy_matches_are_reported():
+    matches = []
+    resolve_headers(['Ngay dat hnag', 'Mã đơn hàng', 'Đơn giá (VNĐ)', 'Số lươngg'], matches)
+    assert [(original, canonical) for original, canonical, _ in matches] == [
+        ('Số lươngg', 'so_luong'), ('Ngay dat hnag', 'ngay_dat_hang'),
+    ]
+    assert all(score < 1 for _, _, score in matches)
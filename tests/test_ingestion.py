@@ -0,0 +1,125 @@
+import io
+import os
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+import ingestion
+from benchmarks.synthetic import make_sales, to_xlsx_bytes
+from ingestion import load_dataset, process_raw, read_csv_streaming, read_raw
+
+ISO_CSV = (
+    'Ngày đặt hàng,Mã đơn hàng,Tên sản phẩm,Danh mục,Số lượng,Đơn giá,Chi phí\n'
+    '2024-01-02,DH1,Áo thun,Thời trang,2,100000,60000\n'
+    '2024-03-04,DH2,Tai nghe,Điện tử,1,250000,150000\n'
+)
+
+
+def test_iso_dates_are_not_read_day_first():
+    # 2024-01-02 là ngày 2 tháng 1, không phải ngày 1 tháng 2
+    expected = [pd.Timestamp('2024-01-02'), pd.Timestamp('2024-03-04')]
+    regular = load_dataset(ISO_CSV.encode(), 'iso.csv')
+    streamed = read_csv_streaming(io.BytesIO(ISO_CSV.encode()))
+    assert list(regular.df['ngay_dat_hang']) == expected
+    assert list(streamed.df['ngay_dat_hang']) == expected
+
+
+def test_day_first_dates_guessed_once_for_whole_file():
+    # Định dạng đoán từ dòng đầu (ngày/tháng/năm) áp cho cả file ở cả hai đường đọc:
+    # 02/01/2024 là ngày 2 tháng 1 kể cả khi dòng sau có ngày > 12; dòng sai định dạng bị loại
+    csv = (
+        'Ngày đặt hàng,Mã đơn hàng,Tên sản phẩm,Danh mục,Số lượng,Đơn giá,Chi phí\n'
+        '02/01/2024,DH1,Áo thun,Thời trang,2,100000,60000\n'
+        '13/01/2024,DH2,Tai nghe,Điện tử,1,250000,150000\n'
+        '2024-01-14,DH3,Tai nghe,Điện tử,1,250000,150000\n'
+    ).encode()
+    expected = [pd.Timestamp('2024-01-02'), pd.Timestamp('2024-01-13')]
+    regular = load_dataset(csv, 'ngay.csv')
+    streamed = read_csv_streaming(io.BytesIO(csv))
+    assert list(regular.df['ngay_dat_hang']) == expected
+    assert list(streamed.df['ngay_dat_hang']) == expected
+    assert regular.raw_rows == streamed.raw_rows == 3
+
+
+def test_streaming_csv_matches_regular_read(sales_csv):
+    regular = process_raw(read_raw(sales_csv, 'ban_hang.csv'))
+    streamed = read_csv_streaming(io.BytesIO(sales_csv), chunk_rows=700)
+    assert streamed.raw_rows == regular.raw_rows
+    assert len(streamed.df) == len(regular.df)
+    for col in ['so_luong', 'doanh_thu', 'loi_nhuan']:
+        assert streamed.df[col].sum() == pytest.approx(regular.df[col].sum(), rel=1e-12)
+
+
+def test_upper_case_xlsx_suffix():
+    result = load_dataset(to_xlsx_bytes(make_sales(40, n_days=10)), 'BAO_CAO.XLSX')
+    assert result.missing_columns is None
+    assert len(result.df) == 40
+
+
+def test_excel_header_below_title_rows_and_columnar_reload(tmp_path):
+    wb = Workbook()
+    ws = wb.active
+    ws.append(['BÁO CÁO BÁN HÀNG'])
+    ws.append([])
+    ws.append(['Ngay dat hnag', 'Mã đơn', 'Tên SP', 'Danh mục', 'SL', 'Đơn giá (VNĐ)', 'Giá vốn'])
+    ws.append(['02/01/2024', 'DH1', 'Áo thun', 'Thời trang', 2, 100000, 60000])
+    ws.append(['03/01/2024', 'DH2', 'Tai nghe', 'Điện tử', 1, 250000, 150000])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+
+    first = load_dataset(buffer.getvalue(), 'bao_cao.xlsx', columnar_dir=str(tmp_path))
+    assert first.missing_columns is None and len(first.df) == 2
+    assert first.header_matches == [('Ngay dat hnag', 'ngay_dat_hang', pytest.approx(0.818, abs=1e-3))]
+    assert os.listdir(tmp_path)
+
+    # Lần hai đọc từ bản sao dạng cột: cùng dữ liệu và vẫn còn danh sách cột khớp gần đúng
+    second = load_dataset(buffer.getvalue(), 'bao_cao.xlsx', columnar_dir=str(tmp_path))
+    pd.testing.assert_frame_equal(second.df.reset_index(drop=True), first.df.reset_index(drop=True))
+    assert second.header_matches == first.header_matches
+
+
+def test_missing_columns_reported():
+    csv = 'Ngày giao hàng,Mã đơn hàng,Tên khách hàng,Danh mục,Số lượng tồn,Đơn giá,Chi phí\n01/02/2024,DH1,A,X,1,2,1\n'
+    result = load_dataset(csv.encode(), 'thieu.csv')
+    assert result.df is None
+    assert sorted(result.missing_columns) == ['ngay_dat_hang', 'so_luong', 'ten_san_pham']
+
+
+def test_streaming_used_for_large_csv(sales_csv, monkeypatch):
+    calls = []
+    monkeypatch.setattr(ingestion, 'CSV_STREAMING_MIN_BYTES', 0)
+    monkeypatch.setattr(ingestion, 'read_csv_streaming',
+                        lambda buffer, **kwargs: calls.append(kwargs) or read_csv_streaming(buffer, **kwargs))
+    result = load_dataset(sales_csv, 'ban_hang.csv')
+    assert calls == [{'keep_rows': True}]
+    assert result.missing_columns is None and result.cube is not None
+
+
+def test_aggregate_only_used_for_very_large_csv(sales_csv, monkeypatch):
+    monkeypatch.setattr(ingestion, 'CSV_STREAMING_MIN_BYTES', 0)
+    monkeypatch.setattr(ingestion, 'CSV_AGGREGATE_ONLY_BYTES', 0)
+    result = load_dataset(sales_csv, 'ban_hang.csv')
+    # Không giữ từng dòng, chỉ giữ khối tổng hợp
+    assert result.df is None and result.filter_index is None
+    assert result.missing_columns is None and result.cube is not None
+
+
+def test_aggregate_only_csv_matches_regular_read(sales, sales_csv):
+    # Nhiều khối nhỏ: các ô / đơn hàng của cùng một ngày nằm ở nhiều khối phải được cộng dồn đúng
+    result = read_csv_streaming(io.BytesIO(sales_csv), chunk_rows=700, keep_rows=False)
+    assert result.df is None
+    assert result.raw_rows == sales.raw_rows
+
+    categories = list(sales.cube.categories)
+    start, end = sales.cube.days.min(), sales.cube.days.max()
+    expected = sales.cube.select(categories, start, end)
+    selection = result.cube.select(categories, start, end)
+    assert selection.order_count() == expected.order_count()
+    for col in ['doanh_thu', 'loi_nhuan', 'so_luong']:
+        assert selection.totals()[col] == pytest.approx(expected.totals()[col], rel=1e-12)
+    pd.testing.assert_frame_equal(selection.revenue_by_date(), expected.revenue_by_date(), rtol=1e-12)
+    pd.testing.assert_frame_equal(
+        selection.profit_by_product().sort_values('ten_san_pham', ignore_index=True),
+        expected.profit_by_product().sort_values('ten_san_pham', ignore_index=True), rtol=1e-12, check_dtype=False
+    )
@@ -0,0 +1,20 @@
+import numpy as np
+from sklearn.ensemble import IsolationForest
+
+from model_registry import ModelRegistry, serialized_size
+
+
+def test_memory_budget_counts_serialized_model_size(tmp_path):
+    model = IsolationForest(n_estimators=20, random_state=0).fit(np.random.default_rng(0).random((500, 3)))
+    size = serialized_size(model)
+    # sys.getsizeof chỉ thấy vỏ đối tượng (vài chục byte), không thấy các cây bên trong
+    assert size > 10_000
+
+    registry = ModelRegistry(int(size * 1.5), 10 * size, str(tmp_path))
+    registry.get_or_compute('a', 'du_lieu_a', {}, lambda: model)
+    assert registry.stats()['bytes'] == size
+    # Mô hình thứ hai vượt ngân sách RAM nên mô hình đầu bị đẩy ra (vẫn còn trên ổ đĩa)
+    registry.get_or_compute('b', 'du_lieu_b', {}, lambda: model)
+    assert registry.stats()['entries'] == 1 and registry.stats()['evictions'] == 1
+    registry.get_or_compute('a', 'du_lieu_a', {}, lambda: None)
+    assert registry.stats()['disk_hits'] == 1 and registry.stats()['fits'] == 2
@@ -0,0 +1,114 @@
+import os
+
+import pandas as pd
+import pytest
+
+import storage
+from aggregation import SalesCube
+from storage import STORE_KEY, OrderStore, columnar_path, read_columnar, write_columnar
+
+
+def _days(df):
+    return set(df['ngay_dat_hang'].dt.floor('D'))
+
+
+def test_append_merges_by_key_and_logs_changed_days(tmp_path, sales):
+    # Khóa chỉ xuất hiện một lần: dữ liệu giả lập có thể lặp khóa ở nhiều tháng
+    df = sales.df.drop_duplicates(STORE_KEY, keep=False)
+    store = OrderStore(str(tmp_path))
+    january = df[df['ngay_dat_hang'] < '2024-02-01']
+    report = store.append(january, source='thang_1')
+    assert report.added_rows == len(january.drop_duplicates(STORE_KEY))
+    assert store.append(january, source='thang_1').skipped
+
+    # Sửa 10 dòng cũ (cùng khóa, cùng tháng) và thêm dữ liệu tháng 3
+    edited = january.drop_duplicates(STORE_KEY).iloc[:10].assign(so_luong=99)
+    march = df[(df['ngay_dat_hang'] >= '2024-03-01') & (df['ngay_dat_hang'] < '2024-04-01')]
+    version = store.version
+    report = store.append(pd.concat([edited, march]), source='sua')
+    assert report.replaced_rows == 10
+    assert report.added_rows == len(march.drop_duplicates(STORE_KEY))
+    assert set(report.affected_dates) == _days(edited) | _days(march)
+    assert set(store.changed_dates(version)) == set(report.affected_dates)
+    assert set(store.changed_dates(0)) == _days(january) | _days(march)
+
+    stored = store.load()
+    assert not stored.duplicated(STORE_KEY).any()
+    merged = stored.merge(edited[STORE_KEY], on=STORE_KEY)
+    assert (merged['so_luong'] == 99).all() and len(merged) == 10
+
+    # Bảng tổng hợp được cập nhật từng phần phải khớp với tính lại từ đầu
+    incremental, rebuilt = SalesCube(*store.aggregates()), SalesCube.from_frame(stored)
+    assert incremental.n_orders == rebuilt.n_orders
+    for col, value in rebuilt.cells[['doanh_thu', 'loi_nhuan', 'so_luong']].sum().items():
+        assert incremental.cells[col].sum() == pytest.approx(value)
+
+
+def test_clear_invalidates_change_log(tmp_path, sales):
+    store = OrderStore(str(tmp_path))
+    store.append(sales.df.iloc[:200], source='a')
+    version = store.version
+    store.clear()
+    assert store.empty and store.load().empty
+    assert store.version == version + 1
+    assert store.changed_dates(version) is None
+    assert store.changed_dates(store.version).empty
+
+    # Cùng file được cộng lại sau khi xóa kho
+    report = store.append(sales.df.iloc[:200], source='a')
+    assert not report.skipped
+    assert set(store.changed_dates(version + 1)) == set(report.affected_dates)
+    assert OrderStore(str(tmp_path)).changed_dates(version) is None
+
+
+@pytest.mark.parametrize('legacy', [False, True])
+def test_row_moved_to_another_month_is_not_kept_twice(tmp_path, sales, legacy):
+    df = sales.df.drop_duplicates(STORE_KEY, keep=False)
+    january = df[df['ngay_dat_hang'] < '2024-02-01']
+    store = OrderStore(str(tmp_path))
+    store.append(january, source='thang_1')
+    if legacy:
+        # Kho ghi bởi phiên bản chưa có chỉ mục khóa: chỉ mục được dựng lại từ các phân vùng
+        os.remove(tmp_path / 'keys.arrow')
+
+    # Dòng ngày 31/01 được sửa ngày thành 01/02 trong file xuất lần sau
+    moved = january[january['ngay_dat_hang'].dt.day == 31].drop_duplicates(STORE_KEY).iloc[:3]
+    moved = moved.assign(ngay_dat_hang=pd.Timestamp('2024-02-01 09:00'))
+    report = OrderStore(str(tmp_path)).append(moved, source='sua_ngay')
+    assert report.replaced_rows == 3 and report.added_rows == 0
+    assert {pd.Timestamp('2024-01-31'), pd.Timestamp('2024-02-01')} <= set(report.affected_dates)
+
+    stored = store.load()
+    assert len(stored) == len(january.drop_duplicates(STORE_KEY))
+    assert not stored.duplicated(STORE_KEY).any()
+    assert (stored.merge(moved[STORE_KEY], on=STORE_KEY)['ngay_dat_hang'] == pd.Timestamp('2024-02-01 09:00')).all()
+
+    incremental, rebuilt = SalesCube(*store.aggregates()), SalesCube.from_frame(stored)
+    assert incremental.n_orders == rebuilt.n_orders
+    for col, value in rebuilt.cells[['doanh_thu', 'loi_nhuan', 'so_luong']].sum().items():
+        assert incremental.cells[col].sum() == pytest.approx(value)
+
+
+def test_columnar_copies_pruned_oldest_first(tmp_path, sales):
+    df = sales.df.iloc[:200]
+    assert write_columnar('a', df, 200, str(tmp_path))
+    size = os.path.getsize(columnar_path('a', str(tmp_path)))
+    os.utime(columnar_path('a', str(tmp_path)), (1, 1))
+    assert write_columnar('b', df, 200, str(tmp_path))
+    os.utime(columnar_path('b', str(tmp_path)), (2, 2))
+    # Đọc 'a' đánh dấu nó vừa được dùng nên bản bị xóa khi vượt dung lượng là 'b'
+    assert read_columnar('a', str(tmp_path)) is not None
+    assert write_columnar('c', df, 200, str(tmp_path), max_bytes=2 * size)
+    assert sorted(os.listdir(tmp_path)) == [os.path.basename(columnar_path(key, str(tmp_path))) for key in 'ac']
+
+
+def test_columnar_copies_from_older_version_not_reused(tmp_path, sales, monkeypatch):
+    df = sales.df.iloc[:50]
+    monkeypatch.setattr(storage, 'COLUMNAR_VERSION', 1)
+    assert write_columnar('a', df, 50, str(tmp_path))
+    monkeypatch.setattr(storage, 'COLUMNAR_VERSION', 2)
+    assert read_columnar('a', str(tmp_path)) is None
+    assert write_columnar('a', df, 50, str(tmp_path), header_matches=[('SL', 'so_luong', 0.9)])
+    stored_df, raw_rows, header_matches = read_columnar('a', str(tmp_path))
+    assert raw_rows == 50 and header_matches == [('SL', 'so_luong', 0.9)]
+    pd.testing.assert_frame_equal(stored_df, df.reset_index(drop=True))